@@ -0,0 +1,56 @@
+"""Mikrobenchmark budowania embedów postaci: dawny kod z /roll vs character_embed.
+
+Uruchomienie z katalogu repozytorium:  python benchmarks/bench_embeds.py [rundy]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+import bot
+
+
+def build_from_scratch(character):
+    # Dawny sposób z /roll: słownik kolorów i embed składany przy każdym wywołaniu
+    rarity_colors = {
+        "Common": discord.Color.light_gray(),
+        "Rare": discord.Color.blue(),
+        "Epic": discord.Color.purple(),
+        "Legendary": discord.Color.gold()
+    }
+    color = rarity_colors.get(character["rarity"], discord.Color.default())
+    embed = discord.Embed(title=f"You found {character['name']}!", color=color)
+    embed.set_image(url=character["image"])
+    embed.set_footer(text=f"Rarity: {character['rarity']}")
+    return embed
+
+
+def build_with_helper(character):
+    return bot.character_embed("roll", character)
+
+
+def measure(build, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for character in bot.catalog.characters:
+            build(character)
+    return time.perf_counter() - start
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = rounds * len(bot.catalog.characters)
+
+    # Oba sposoby muszą dawać ten sam embed
+    for character in bot.catalog.characters:
+        assert build_from_scratch(character).to_dict() == build_with_helper(character).to_dict(), character["id"]
+
+    for label, build in (("from scratch", build_from_scratch), ("helper", build_with_helper)):
+        elapsed = measure(build, rounds)
+        print(f"{label:>12}: {count} embeds in {elapsed:.3f}s ({elapsed / count * 1e6:.2f} µs/embed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Test statystyczny WeightedSampler: rozkład losowań zgodny z wagami `chance` z katalogu.
+
+Sprawdza sampler świeżo zbudowany i po serii set_weight (claimy, usunięcia,
+wygaśnięcia rezerwacji): wyłączone postacie nigdy nie wypadają, drzewo po
+aktualizacjach jest takie samo jak zbudowane od zera, a częstości losowań
+przechodzą test chi-kwadrat względem `chance` dostępnych postaci.
+Przy niezgodności kończy się statusem 1.
+
+Uruchomienie z katalogu repozytorium:
+    python benchmarks/check_sampler.py [--draws 400000] [--alpha 0.001]
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_harness
+
+MIN_EXPECTED = 5  # kubełki z mniejszą oczekiwaną liczbą łączymy (warunek testu chi-kwadrat)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chi-square check of the weighted character sampler.")
+    parser.add_argument("--draws", type=int, default=400000)
+    parser.add_argument("--alpha", type=float, default=0.001, help="fail when the p-value is below this")
+    parser.add_argument("--random-seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def chi_square_p_value(chi2, dof):
+    """Prawdopodobieństwo P(X >= chi2) dla rozkładu chi-kwadrat (przybliżenie Wilsona-Hilferty'ego)."""
+    z = ((chi2 / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi_square(counts, chances):
+    """Zwraca (chi2, stopnie swobody) częstości `counts` względem wag `chances` (indeks -> chance)."""
+    draws = sum(counts.values())
+    total = sum(chances.values())
+    bins = []
+    pooled_observed = pooled_expected = 0.0
+    for index, chance in sorted(chances.items(), key=lambda item: item[1]):
+        expected = draws * chance / total
+        if expected < MIN_EXPECTED or pooled_expected:
+            # Najrzadsze postacie sumujemy, aż kubełek będzie wystarczająco duży
+            pooled_observed += counts.get(index, 0)
+            pooled_expected += expected
+            if pooled_expected >= MIN_EXPECTED:
+                bins.append((pooled_observed, pooled_expected))
+                pooled_observed = pooled_expected = 0.0
+        else:
+            bins.append((counts.get(index, 0), expected))
+    if pooled_expected:
+        bins.append((pooled_observed, pooled_expected))
+    chi2 = sum((observed - expected) ** 2 / expected for observed, expected in bins)
+    return chi2, len(bins) - 1
+
+
+def draw(sampler, draws):
+    counts = {}
+    for _ in range(draws):
+        index = sampler.sample()
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def check(bot, label, sampler, available, draws, alpha):
+    """Losuje `draws` razy i porównuje z `chance` dostępnych postaci; zwraca listę problemów."""
+    problems = []
+    counts = draw(sampler, draws)
+    unavailable = [i for i in counts if i not in available]
+    if unavailable:
+        problems.append(f"{label}: drew {len(unavailable)} unavailable characters")
+    chances = {i: bot.catalog.characters[i]["chance"] for i in available}
+    chi2, dof = chi_square(counts, chances)
+    p_value = chi_square_p_value(chi2, dof)
+    print(f"{label:>14}: {len(available)} available, {draws} draws, chi2 = {chi2:.1f} (dof {dof}), p = {p_value:.3f}")
+    if p_value < alpha:
+        problems.append(f"{label}: p = {p_value:.5f} < {alpha}")
+    return problems
+
+
+def main():
+    args = parse_args()
+    bot, workdir = load_harness.import_bot(SimpleNamespace(storage="json"))
+    try:
+        random.seed(args.random_seed)
+        weights = bot.catalog.weights
+        everything = set(range(len(weights)))
+        problems = []
+
+        sampler = bot.WeightedSampler(weights)
+        problems += check(bot, "fresh", sampler, everything, args.draws, args.alpha)
+
+        # Claimy wyłączają ~40% postaci, potem część wraca (usunięcia, wygasłe rezerwacje)
+        available = set(everything)
+        for index in random.sample(sorted(everything), len(weights) * 2 // 5):
+            sampler.set_weight(index, 0)
+            available.discard(index)
+        for index in random.sample(sorted(everything - available), len(weights) // 10):
+            sampler.set_weight(index, weights[index])
+            available.add(index)
+
+        rebuilt = bot.WeightedSampler(w if i in available else 0 for i, w in enumerate(weights))
+        if (sampler.tree, sampler.total) != (rebuilt.tree, rebuilt.total):
+            problems.append("after set_weight: Fenwick tree differs from a fresh build")
+        problems += check(bot, "after updates", sampler, available, args.draws, args.alpha)
+
+        for index in list(available):
+            sampler.set_weight(index, 0)
+        if sampler.sample() is not None:
+            problems.append("all weights zero: sample() did not return None")
+    finally:
+        bot.storage_executor.shutdown(wait=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for problem in problems:
+        print(problem)
+    if problems:
+        print("FAIL")
+        sys.exit(1)
+    print("OK: draws match the catalog chance weights")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""Syntetyczne obciążenie bota bez Discorda: komendy i spawny na sztucznych serwerach.
+
+Interaction, Guild, Member, Message i kanały są podróbkami, reakcje trafiają przez
+prawdziwy on_raw_reaction_add, a przyciski/listy w widokach "klika" symulowany
+użytkownik. Dane lądują w katalogu tymczasowym, więc test działa offline (CI).
+
+Uruchomienie z katalogu repozytorium:
+    python benchmarks/load_harness.py --guilds 20 --users 50 --rate 200 --duration 30
+    python benchmarks/load_harness.py --json wynik.json --max-p99-ms 250
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMAND_MIX = {
+    "roll": 35,
+    "collection": 20,
+    "leaderboard": 10,
+    "give": 15,
+    "remove": 5,
+    "trade": 15,
+    "give_many": 2,
+    "remove_many": 1,
+}
+
+ids = itertools.count(10 ** 17)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load harness for the Marvel bot command handlers.")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--users", type=int, default=30, help="members per guild")
+    parser.add_argument("--rate", type=float, default=100.0, help="commands per second (all guilds together)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--seed-characters", type=int, default=5, help="characters owned by each user at start")
+    parser.add_argument("--rest-ms", type=float, default=0.0, help="simulated Discord REST latency per call")
+    parser.add_argument("--react-ms", type=float, default=0.0, help="simulated user reaction/click delay")
+    parser.add_argument("--spawn-seconds", type=float, nargs=2, default=(1.0, 3.0), metavar=("MIN", "MAX"),
+                        help="spawn interval per guild")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--real-limits", action="store_true", help="keep the production /roll limits")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="exit with status 1 when overall p99 exceeds this")
+    return parser.parse_args()
+
+
+def import_bot(args):
+    """Importuje bot.py w pustym katalogu roboczym (własne data/ i kopia katalogu postaci)."""
+    workdir = tempfile.mkdtemp(prefix="marvelbot-bench-")
+    shutil.copy(os.path.join(REPO, "characters.json"), workdir)
+    os.chdir(workdir)
+    os.environ["STORAGE_BACKEND"] = args.storage
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, REPO)
+    import bot
+    return bot, workdir
+
+
+class FakeAvatar:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+
+class FakeMember:
+    def __init__(self, member_id):
+        self.id = member_id
+        self.name = f"user{member_id % 100000}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+        self.display_avatar = FakeAvatar()
+        self.bot = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id, members):
+        self.id = guild_id
+        self.members = {m.id: m for m in members}
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+
+class FakeMessage:
+    def __init__(self, harness, reactor=None):
+        self.id = next(ids)
+        self.harness = harness
+        self.reactor = reactor  # funkcja zwracająca ID użytkownika, który zareaguje ✅
+
+    async def add_reaction(self, emoji):
+        await self.harness.rest()
+        if self.reactor is not None:
+            self.harness.react_later(self.id, self.reactor())
+
+    async def reply(self, content=None, **kwargs):
+        await self.harness.rest()
+        return FakeMessage(self.harness)
+
+
+class FakeChannel:
+    def __init__(self, harness, guild):
+        self.id = next(ids)
+        self.mention = f"<#{self.id}>"
+        self.harness = harness
+        self.member_ids = list(guild.members)
+
+    async def send(self, content=None, **kwargs):
+        await self.harness.rest()
+        # Spawn zbiera losowy członek serwera
+        return FakeMessage(self.harness, reactor=lambda: random.choice(self.member_ids))
+
+
+class FakeResponse:
+    def __init__(self, harness):
+        self.harness = harness
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, *, view=None, **kwargs):
+        self.done = True
+        await self.harness.rest()
+        if view is not None:
+            self.harness.click_later(view)
+
+    async def edit_message(self, **kwargs):
+        self.done = True
+        await self.harness.rest()
+
+    async def defer(self, **kwargs):
+        self.done = True
+        await self.harness.rest()
+
+
+class FakeFollowup:
+    def __init__(self, harness):
+        self.harness = harness
+
+    async def send(self, content=None, *, view=None, **kwargs):
+        await self.harness.rest()
+        if view is not None:
+            self.harness.click_later(view)
+        return FakeMessage(self.harness)
+
+
+class FakeInteraction:
+    def __init__(self, harness, guild, user):
+        self.id = next(ids)
+        self.harness = harness
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.response = FakeResponse(harness)
+        self.followup = FakeFollowup(harness)
+
+    async def original_response(self):
+        await self.harness.rest()
+        # Po /roll reaguje ten, kto losował
+        return FakeMessage(self.harness, reactor=lambda: self.user.id)
+
+
+class Harness:
+    """Wspólny stan podróbek: opóźnienia REST/reakcji, kanały i symulowani użytkownicy."""
+
+    def __init__(self, bot, args):
+        self.bot = bot
+        self.rest_delay = args.rest_ms / 1000
+        self.react_delay = args.react_ms / 1000
+        self.channels = {}
+        self.rest_calls = 0
+
+    async def rest(self):
+        # Każde wywołanie REST kosztuje tyle, ile podano w --rest-ms
+        self.rest_calls += 1
+        await asyncio.sleep(self.rest_delay)
+
+    def react_later(self, message_id, user_id):
+        """Symuluje dodanie reakcji ✅ przez użytkownika (przez prawdziwy handler zdarzenia)."""
+        payload = SimpleNamespace(message_id=message_id, user_id=user_id, emoji="✅")
+
+        async def react():
+            await asyncio.sleep(self.react_delay)
+            await self.bot.on_raw_reaction_add(payload)
+
+        asyncio.get_running_loop().create_task(react())
+
+    def click_later(self, view):
+        """Symuluje odpowiedź na widok: potwierdzenie usunięcia albo wybór pierwszej postaci."""
+        async def click():
+            await asyncio.sleep(self.react_delay)
+            if hasattr(view, "selected_character"):
+                options = getattr(view, "options", None)
+                view.selected_character = options[0].label if options else None
+            elif hasattr(view, "value"):
+                view.value = True
+            else:
+                return  # np. CollectionView - nikt nie klika, widok po prostu zostaje
+            view.stop()
+
+        asyncio.get_running_loop().create_task(click())
+
+    def channel(self, guild):
+        channel = FakeChannel(self, guild)
+        self.channels[channel.id] = channel
+        return channel
+
+    def interaction(self, guild, user):
+        return FakeInteraction(self, guild, user)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje KiB, macOS bajty
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def monitor_loop_lag(samples, interval=0.01):
+    """Mierzy, o ile pętla spóźnia się z wybudzeniem krótkiego sleepa."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0.0))
+
+
+async def run(bot, args):
+    random.seed(args.random_seed)
+    harness = Harness(bot, args)
+
+    if not args.real_limits:
+        bot.ROLL_LIMIT = bot.CLAIMS_PER_WINDOW = 10 ** 9
+        bot.ROLL_COOLDOWN_SECONDS = 0
+    bot.SPAWN_MIN_SECONDS, bot.SPAWN_MAX_SECONDS = args.spawn_seconds
+    bot.bot.get_channel = lambda channel_id: harness.channels.get(channel_id)
+
+    async def ready():
+        return None
+    bot.bot.wait_until_ready = ready
+
+    # Serwery, członkowie i początkowe kolekcje
+    guilds = []
+    for _ in range(args.guilds):
+        guild = FakeGuild(next(ids), [FakeMember(next(ids)) for _ in range(args.users)])
+        guild_id = str(guild.id)
+        await bot.ensure_guild_loaded(guild_id)
+        for member in guild.members.values():
+            for _ in range(args.seed_characters):
+                character = bot.get_random_character(guild_id)
+                if character is not None:
+                    bot.record_mutation(guild_id, {"op": "claim", "user": str(member.id), "id": character["id"]})
+        bot.spawn_channels[guild_id] = harness.channel(guild).id
+        guilds.append(guild)
+
+    bot.expiry_engine.start()
+    bot.flush_journals.start()
+    bot.compact_journals.start()
+    for guild in guilds:
+        bot.spawn_scheduler.start(str(guild.id))
+
+    def owned_name(guild, member):
+        owned = bot.collection_of(str(guild.id), str(member.id))
+        if not owned:
+            return "nobody"
+        return bot.get_character(random.choice(list(owned)))["name"]
+
+    def invocation(name):
+        guild = random.choice(guilds)
+        user, other = random.sample(list(guild.members.values()), 2)
+        interaction = harness.interaction(guild, user)
+        command = getattr(bot, name).callback
+        if name == "give":
+            return command(interaction, other, owned_name(guild, user))
+        if name == "remove":
+            return command(interaction, owned_name(guild, user))
+        if name == "trade":
+            return command(interaction, other)
+        # Zbiorcze komendy na jednej rzadkości ("All" szybko opróżniłoby kolekcje)
+        rarity = random.choice(bot.BULK_RARITY_CHOICES[1:])
+        if name == "give_many":
+            return command(interaction, other, rarity)
+        if name == "remove_many":
+            return command(interaction, rarity)
+        return command(interaction)
+
+    latencies = {name: [] for name in COMMAND_MIX}
+    errors = {}
+    lag_samples = []
+    in_flight = set()
+    names, weights = zip(*COMMAND_MIX.items())
+
+    async def timed(name):
+        start = time.perf_counter()
+        try:
+            await invocation(name)
+        except Exception as e:
+            key = f"{name}: {type(e).__name__}: {e}"
+            errors[key] = errors.get(key, 0) + 1
+        else:
+            latencies[name].append(time.perf_counter() - start)
+
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    interval = 1 / args.rate
+    issued = 0
+    # Obciążenie w pętli otwartej: komendy startują według zegara, niezależnie od tego,
+    # czy poprzednie się skończyły
+    while True:
+        now = loop.time()
+        if now - started >= args.duration:
+            break
+        due = int((now - started) / interval) + 1
+        while issued < due:
+            task = asyncio.create_task(timed(random.choices(names, weights)[0]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            issued += 1
+        await asyncio.sleep(interval)
+    if in_flight:
+        await asyncio.wait(in_flight, timeout=30)
+    elapsed = loop.time() - started
+    lag_task.cancel()
+
+    for guild in guilds:
+        bot.spawn_scheduler.stop(str(guild.id))
+    await bot.flush_pending()
+    bot.flush_journals.cancel()
+    bot.compact_journals.cancel()
+
+    every = sorted(itertools.chain.from_iterable(latencies.values()))
+    lag_samples.sort()
+    spawn_stats = bot.spawn_scheduler.stats()
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json",)},
+        "elapsed_seconds": round(elapsed, 3),
+        "issued": issued,
+        "completed": len(every),
+        "unfinished": len(in_flight),
+        "throughput_per_second": round(len(every) / elapsed, 1),
+        "latency_ms": {
+            name: {
+                "count": len(values),
+                "p50": round(percentile(sorted(values), 0.50) * 1000, 2),
+                "p99": round(percentile(sorted(values), 0.99) * 1000, 2),
+                "max": round(max(values, default=0.0) * 1000, 2),
+            }
+            for name, values in list(latencies.items()) + [("all", every)]
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lag_samples, 0.50) * 1000, 2),
+            "p99": round(percentile(lag_samples, 0.99) * 1000, 2),
+            "max": round(max(lag_samples, default=0.0) * 1000, 2),
+        },
+        "spawns": {"skipped": spawn_stats["skipped"], "lag_max_seconds": round(spawn_stats["lag_max"], 3)},
+        "rest_calls": harness.rest_calls,
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": errors,
+    }
+
+
+def print_report(report):
+    print(f"{report['completed']}/{report['issued']} commands in {report['elapsed_seconds']}s "
+          f"-> {report['throughput_per_second']}/s ({report['unfinished']} unfinished)")
+    print(f"{'command':>12} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in report["latency_ms"].items():
+        print(f"{name:>12} {stats['count']:>7} {stats['p50']:>9} {stats['p99']:>9} {stats['max']:>9}")
+    lag = report["loop_lag_ms"]
+    print(f"event loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    print(f"spawns skipped: {report['spawns']['skipped']}, worst spawn lag {report['spawns']['lag_max_seconds']}s")
+    if report["peak_rss_mb"] is not None:
+        print(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
+    for error, count in sorted(report["errors"].items()):
+        print(f"error x{count}: {error}")
+
+
+def main():
+    args = parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)  # import_bot zmienia katalog roboczy
+    bot, workdir = import_bot(args)
+    try:
+        report = asyncio.run(run(bot, args))
+    finally:
+        bot.storage_executor.shutdown(wait=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.max_p99_ms is not None and report["latency_ms"]["all"]["p99"] > args.max_p99_ms:
+        print(f"FAIL: p99 {report['latency_ms']['all']['p99']} ms > {args.max_p99_ms} ms")
+        sys.exit(1)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Test obciążeniowy blokad: równoległe /give, /give_many i /trade na wielu serwerach.
+
+Używa podróbek Discorda z load_harness.py. Po burzy komend sprawdza, że nic się
+nie zakleszczyło, że żadna postać nie zniknęła ani się nie zdublowała, że
+posiadanie, indeksy i ranking są spójne oraz że stan po ponownym wczytaniu
+z dysku jest taki sam jak w pamięci - także gdy zamknięcie trafi na zapis
+dziennika w toku. Przy naruszeniu kończy się statusem 1.
+
+Uruchomienie z katalogu repozytorium:
+    python benchmarks/stress_locks.py --guilds 50 --operations 20000
+    python benchmarks/stress_locks.py --storage sqlite
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_harness
+from load_harness import FakeGuild, FakeMember, Harness, ids
+
+OPERATION_MIX = {
+    "give": 40,
+    "trade": 40,
+    "give_many": 5,
+    "snapshot": 15,  # zapis snapshotu bierze blokadę serwera w trakcie operacji na użytkownikach
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent give/trade storm with ownership invariant checks.")
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--users", type=int, default=8, help="members per guild (few, so operations collide)")
+    parser.add_argument("--seed-characters", type=int, default=6, help="characters owned by each user at start")
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--rest-ms", type=float, default=1.0, help="simulated Discord REST latency per call")
+    parser.add_argument("--react-ms", type=float, default=2.0, help="simulated user click delay")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before the storm counts as deadlocked")
+    parser.add_argument("--flush-seconds", type=float, default=0.05, help="journal flush interval during the test")
+    parser.add_argument("--stall-ms", type=float, default=300.0, help="simulated slow disk at shutdown")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--random-seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def check_guild(bot, guild_id, expected):
+    """Zwraca listę naruszeń niezmienników serwera (pusta - wszystko w porządku)."""
+    problems = []
+    guild = bot.ownership[guild_id]
+    inverse = {c: u for u, chars in guild.collections.items() for c in chars}
+    if inverse != guild.owners:
+        problems.append("owners and collections disagree")
+    owned = Counter(c for chars in guild.collections.values() for c in chars)
+    duplicated = sum(1 for count in owned.values() if count > 1)
+    if set(owned) != expected or duplicated:
+        problems.append(f"characters changed: {len(owned)} owned ({duplicated} duplicated), {len(expected)} expected")
+
+    board = bot.leaderboards[guild_id]
+    for user_id, chars in guild.collections.items():
+        rarities = Counter(bot.get_character(c)["rarity"] for c in chars)
+        counts = [len(chars)] + [rarities.get(r, 0) for r in bot.RARITIES]
+        if board.counts.get(user_id) != counts:
+            problems.append(f"leaderboard of {user_id}: {board.counts.get(user_id)} != {counts}")
+        indexed = {c for ids_ in bot.name_index[guild_id].get(user_id, {}).values() for c in ids_}
+        if indexed != set(chars):
+            problems.append(f"name index of {user_id} out of date")
+        by_rarity = {c for chars_ in bot.rarity_index[guild_id].get(user_id, {}).values() for c in chars_}
+        if by_rarity != set(chars):
+            problems.append(f"rarity index of {user_id} out of date")
+    return problems
+
+
+async def shutdown_during_flush(bot, guilds, expected, args):
+    """Zamyka jak MarvelBot.close, gdy pętla zdjęła już ostatnie rekordy z bufora,
+    a ich append czeka w kolejce za wolnym dyskiem (uśpiony wątek zapisów)."""
+    slow_disk = asyncio.ensure_future(bot.run_storage(time.sleep, args.stall_ms / 1000))
+    await asyncio.sleep(0)
+    for guild in guilds:
+        guild_id = str(guild.id)
+        character = bot.get_random_character(guild_id)
+        if character is not None:
+            bot.record_mutation(guild_id, {"op": "claim", "user": str(next(iter(guild.members))), "id": character["id"]})
+            expected[guild_id].add(character["id"])
+    await asyncio.sleep(args.flush_seconds * 2)
+    bot.flush_journals.cancel()
+    await bot.flush_pending()
+    await slow_disk
+
+
+async def run(bot, args):
+    random.seed(args.random_seed)
+    harness = Harness(bot, args)
+
+    guilds = []
+    expected = {}
+    for _ in range(args.guilds):
+        guild = FakeGuild(next(ids), [FakeMember(next(ids)) for _ in range(args.users)])
+        guild_id = str(guild.id)
+        await bot.ensure_guild_loaded(guild_id)
+        for member in guild.members.values():
+            for _ in range(args.seed_characters):
+                character = bot.get_random_character(guild_id)
+                if character is not None:
+                    bot.record_mutation(guild_id, {"op": "claim", "user": str(member.id), "id": character["id"]})
+        expected[guild_id] = set(bot.ownership[guild_id].owners)
+        guilds.append(guild)
+
+    bot.flush_journals.change_interval(seconds=args.flush_seconds)
+    bot.flush_journals.start()
+
+    def owned_name(guild, member):
+        owned = bot.collection_of(str(guild.id), str(member.id))
+        if not owned:
+            return "nobody"
+        return bot.get_character(random.choice(list(owned)))["name"]
+
+    def operation(name):
+        guild = random.choice(guilds)
+        user, other = random.sample(list(guild.members.values()), 2)
+        interaction = harness.interaction(guild, user)
+        if name == "give":
+            return bot.give.callback(interaction, other, owned_name(guild, user))
+        if name == "trade":
+            return bot.trade.callback(interaction, other)
+        if name == "give_many":
+            return bot.give_many.callback(interaction, other, random.choice(bot.BULK_RARITY_CHOICES[1:]))
+        return bot.save_data(str(guild.id))
+
+    names, weights = zip(*OPERATION_MIX.items())
+    chosen = Counter()
+    tasks = []
+    for _ in range(args.operations):
+        name = random.choices(names, weights)[0]
+        chosen[name] += 1
+        tasks.append(asyncio.ensure_future(operation(name)))
+
+    started = time.perf_counter()
+    done, pending = await asyncio.wait(tasks, timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+    for task in pending:
+        task.cancel()
+    errors = Counter(f"{type(t.exception()).__name__}: {t.exception()}" for t in done if t.exception())
+
+    await shutdown_during_flush(bot, guilds, expected, args)
+
+    problems = {}
+    for guild_id in expected:
+        guild_problems = check_guild(bot, guild_id, expected[guild_id])
+        in_memory = dict(bot.ownership[guild_id].owners)
+        await bot.reload_guild(guild_id)
+        if bot.ownership[guild_id].owners != in_memory:
+            guild_problems.append("state reloaded from storage differs from memory")
+        if guild_problems:
+            problems[guild_id] = guild_problems
+
+    return {
+        "operations": dict(chosen),
+        "elapsed_seconds": round(elapsed, 3),
+        "deadlocked": len(pending),
+        "errors": dict(errors),
+        "problems": problems,
+    }
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault("LOG_LEVEL", "ERROR")  # wolne wywołania są tu oczekiwane, liczy się spójność
+    bot, workdir = load_harness.import_bot(args)
+    try:
+        report = asyncio.run(run(bot, args))
+    finally:
+        bot.storage_executor.shutdown(wait=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ops = ", ".join(f"{count} {name}" for name, count in sorted(report["operations"].items()))
+    print(f"{sum(report['operations'].values())} operations ({ops}) over {args.guilds} guilds "
+          f"in {report['elapsed_seconds']}s")
+    print(f"unfinished (deadlocked): {report['deadlocked']}")
+    for error, count in sorted(report["errors"].items()):
+        print(f"error x{count}: {error}")
+    for guild_id, guild_problems in sorted(report["problems"].items()):
+        for problem in guild_problems:
+            print(f"guild {guild_id}: {problem}")
+    if report["deadlocked"] or report["errors"] or report["problems"]:
+        print("FAIL")
+        sys.exit(1)
+    print("OK: no deadlocks, ownership, indexes and stored state consistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,592 +1,2234 @@
+import time
+STARTED_AT = time.perf_counter()  # początek importu - do raportu czasu startu
+
 import discord
 import random
 import asyncio
 import os
-import time
 import json
+import contextlib
+import re
+import bisect
+import heapq
+from collections import Counter, OrderedDict, deque
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import math
+import contextvars
+import weakref
+import functools
+import logging
+import logging.handlers
+import queue
+import atexit
+import hashlib
+import subprocess
+import urllib.request
 from discord.ui import View, Button
 from discord.ext import commands, tasks
 from discord import app_commands
-from flask import Flask
-from threading import Thread
+from aiohttp import web
 
 DATA_FOLDER = "data"
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
-data_lock = asyncio.Lock()
-user_collection = {}
-claimed_characters = {}
+DATA_VERSION = 2  # 2: kolekcje i claimed_characters trzymają ID postaci z katalogu
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # "json" albo "sqlite"
+SQLITE_PATH = os.path.join(DATA_FOLDER, "marvelbot.db")
+
+# Sharding: SHARD_COUNT to łączna liczba shardów, SHARD_IDS - shardy obsługiwane przez
+# ten proces ("0-3" albo "0,2,5"). Bez SHARD_IDS proces obsługuje wszystkie shardy.
+def parse_shard_ids(text):
+    shard_ids = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        first, _, last = part.partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", "")) or None
+if SHARD_IDS and not SHARD_COUNT:
+    raise ValueError("SHARD_IDS requires SHARD_COUNT")
+PROCESS_LABEL = f"shards-{SHARD_IDS[0]}-{SHARD_IDS[-1]}" if SHARD_IDS else "main"
+owned_shards = frozenset(SHARD_IDS) if SHARD_IDS else None
+
+def owns_guild(guild_id):
+    """Czy serwer należy do shardów tego procesu (shard = (guild_id >> 22) % SHARD_COUNT)."""
+    return owned_shards is None or (int(guild_id) >> 22) % SHARD_COUNT in owned_shards
+
+# Każdy proces zapisuje własny plik limitów (serwery są rozdzielone między procesy)
+ROLL_LIMITS_FILE = os.path.join(DATA_FOLDER, "roll_limits.json" if SHARD_IDS is None else f"roll_limits_{PROCESS_LABEL}.json")
+
+# Logowanie: pętla bota tylko wrzuca rekord do kolejki, a formatowaniem i zapisem
+# na stdout zajmuje się wątek QueueListener. Zdarzenia to krótkie podsumowania
+# (serwer, operacja, liczby elementów, czas) - nigdy całe dane.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+log = logging.getLogger("marvelbot")
+
+class SummaryFormatter(logging.Formatter):
+    """Jedna linia na zdarzenie: czas, poziom, komunikat i pola key=value."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+def setup_logging():
+    """Podpina kolejkę do loggera i uruchamia wątek zapisujący."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(SummaryFormatter("%(asctime)s %(levelname)s %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+    listener.start()
+    atexit.register(listener.stop)  # stop() dopisuje resztę kolejki przed wyjściem
+    return listener
+
+def log_event(level, message, **fields):
+    """Loguje zdarzenie z polami (guild, op, liczniki, ms); poniżej poziomu nic nie kosztuje."""
+    if log.isEnabledFor(level):
+        log.log(level, message, extra={"fields": fields})
+
+log_listener = setup_logging()
+
+# Pomiar komend i zapisów: czas każdego wywołania dzielimy na fazy i zbieramy
+# w histogramach (eksportowanych w /metrics). "wait" to czekanie na reakcję
+# lub przycisk użytkownika - nie wlicza się do czasu uznawanego za wolny.
+MEASURED_PHASES = ("lock", "io", "rest", "wait")
+PHASES = MEASURED_PHASES + ("compute",)  # compute = reszta czasu wywołania
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SLOW_COMMAND_SECONDS = float(os.getenv("SLOW_COMMAND_SECONDS", "2"))
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # ostatni kubełek to +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Timing:
+    """Czasy faz jednego wywołania; active to trwająca faza (zagnieżdżone liczymy raz)."""
+
+    __slots__ = ("phases", "active")
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.active = None
+
+current_timing = contextvars.ContextVar("current_timing", default=None)
+latency_histograms = {}  # (operacja, faza lub "total") -> Histogram
+slow_operations = {}  # operacja -> liczba wywołań ponad SLOW_COMMAND_SECONDS
+
+@contextlib.contextmanager
+def phase(name):
+    """Dolicza czas bloku do fazy `name` bieżącego pomiaru (poza pomiarem nic nie robi)."""
+    timing = current_timing.get()
+    if timing is None or timing.active is not None:
+        yield
+        return
+    timing.active = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.phases[name] += time.perf_counter() - start
+        timing.active = None
+
+@contextlib.contextmanager
+def timed_operation(name):
+    """Mierzy całe wywołanie: histogramy faz, log wolnych wywołań, doliczenie do nadrzędnego."""
+    parent = current_timing.get()
+    timing = Timing()
+    token = current_timing.set(timing)
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        total = time.perf_counter() - start
+        current_timing.reset(token)
+        phases = timing.phases
+        phases["compute"] = max(total - sum(phases[p] for p in MEASURED_PHASES), 0.0)
+        for phase_name, value in phases.items():
+            latency_histograms.setdefault((name, phase_name), Histogram()).observe(value)
+        latency_histograms.setdefault((name, "total"), Histogram()).observe(total)
+        if parent is not None:
+            for phase_name in MEASURED_PHASES:
+                parent.phases[phase_name] += phases[phase_name]
+        if total - phases["wait"] > SLOW_COMMAND_SECONDS:
+            slow_operations[name] = slow_operations.get(name, 0) + 1
+            breakdown = {p: round(phases[p] * 1000) for p in PHASES}
+            log_event(logging.WARNING, "🐢 Wolne wywołanie", op=name, ms=round(total * 1000), **breakdown)
+
+def timed_command(func):
+    """Dekorator komendy slash: całe wywołanie mierzone jako operacja o nazwie funkcji."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with timed_operation(func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+def _timed_rest(request):
+    @functools.wraps(request)
+    async def timed_request(*args, **kwargs):
+        with phase("rest"):
+            return await request(*args, **kwargs)
+    return timed_request
+
+# Każde wywołanie REST przechodzi przez jedną z tych metod: HTTPClient (wiadomości,
+# reakcje, fetch_user) albo adapter webhooków (odpowiedzi na interakcje i followupy)
+discord.http.HTTPClient.request = _timed_rest(discord.http.HTTPClient.request)
+discord.webhook.async_.AsyncWebhookAdapter.request = _timed_rest(discord.webhook.async_.AsyncWebhookAdapter.request)
+
+class TimedLock(asyncio.Lock):
+    """asyncio.Lock, który dolicza czas czekania na blokadę do fazy "lock"."""
+
+    async def acquire(self):
+        if not self.locked():
+            return await super().acquire()
+        with phase("lock"):
+            return await super().acquire()
+
+class LockManager:
+    """Blokady per serwer i per użytkownik zamiast jednej globalnej blokady.
+
+    Blokada serwera chroni odczyt/zapis jego plików, blokady użytkowników
+    chronią operacje na kolekcjach. Kilku użytkowników blokujemy zawsze
+    w kolejności posortowanych ID, więc give/trade nie mogą się zakleszczyć.
+    """
+
+    def __init__(self):
+        # Słabe referencje: blokada znika sama, gdy nikt jej nie trzyma ani na nią nie czeka
+        # (czekający trzyma ją w ramce korutyny), więc nie ma czego sprzątać przy wyrzucaniu serwera
+        self.guild_locks = weakref.WeakValueDictionary()
+        self.user_locks = weakref.WeakValueDictionary()  # (guild_id, user_id) -> blokada
+
+    def guild(self, guild_id):
+        lock = self.guild_locks.get(guild_id)
+        if lock is None:
+            lock = self.guild_locks[guild_id] = TimedLock()
+        return lock
+
+    def user(self, guild_id, user_id):
+        lock = self.user_locks.get((guild_id, user_id))
+        if lock is None:
+            lock = self.user_locks[guild_id, user_id] = TimedLock()
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def users(self, guild_id, *user_ids):
+        async with contextlib.AsyncExitStack() as stack:
+            for user_id in sorted(set(user_ids)):
+                await stack.enter_async_context(self.user(guild_id, user_id))
+            yield
+
+locks = LockManager()
+
+class Ownership:
+    """Posiadanie postaci na serwerze w obu kierunkach, zmieniane zawsze razem.
+
+    owners: ID postaci -> użytkownik, collections: użytkownik -> {ID postaci: None}
+    (kolejność zdobycia). Postać ma najwyżej jednego właściciela, więc pytania
+    "kto ma X" i "co ma Y" to po jednym odczycie słownika.
+    """
+
+    __slots__ = ("owners", "collections")
+
+    def __init__(self):
+        self.owners = {}
+        self.collections = {}
+
+    def add(self, user_id, character_id):
+        """Dodaje postać bez właściciela do kolekcji; zwraca False, jeśli ktoś już ją ma."""
+        if character_id in self.owners:
+            return False
+        self.owners[character_id] = user_id
+        self.collections.setdefault(user_id, {})[character_id] = None
+        return True
+
+    def remove(self, user_id, character_id):
+        """Zabiera postać użytkownikowi; zwraca False, jeśli jej nie miał."""
+        if self.owners.get(character_id) != user_id:
+            return False
+        del self.owners[character_id]
+        chars = self.collections[user_id]
+        del chars[character_id]
+        if not chars:
+            del self.collections[user_id]
+        return True
+
+    @classmethod
+    def from_collections(cls, collections):
+        """Buduje posiadanie z kolekcji snapshotu; zwraca (ownership, [(user_id, ID)] pominiętych duplikatów)."""
+        ownership = cls()
+        duplicates = []
+        for user_id, chars in collections.items():
+            for character_id in chars:
+                if not ownership.add(user_id, character_id):
+                    duplicates.append((user_id, character_id))
+        return ownership, duplicates
+
+ownership = {}           # guild_id -> Ownership
+# guild_id -> [(user_id, ID postaci)] duplikatów z dysku. Snapshot takiego serwera zapisałby
+# tylko pierwszego właściciela i ukrył problem przed check-ownership, więc do naprawy
+# zapisujemy wyłącznie dziennik.
+ownership_conflicts = {}
+name_index = {}          # guild_id -> user_id -> {znormalizowana nazwa: [ID postaci]}
+prefix_index = {}        # guild_id -> user_id -> posortowane znormalizowane nazwy (autouzupełnianie)
+leaderboards = {}        # guild_id -> Leaderboard
+rarity_index = {}        # guild_id -> user_id -> {rzadkość: {ID postaci: None}}
+collection_versions = {} # guild_id -> user_id -> numer wersji kolekcji
 
 def get_server_data_file(guild_id):
     return os.path.join(DATA_FOLDER, f"server_{guild_id}.json")
 
-async def save_data(guild_id):
-    """Zapisuje dane użytkowników i postaci dla danego serwera."""
-    async with data_lock:
-        file_path = get_server_data_file(guild_id)
-        data_to_save = {
-            "user_collection": user_collection.get(guild_id, {}),
-            "claimed_characters": claimed_characters.get(guild_id, {})
-        }
+def get_server_journal_file(guild_id):
+    return os.path.join(DATA_FOLDER, f"server_{guild_id}.journal")
+
+JOURNAL_FLUSH_SECONDS = 2           # co ile sekund dziennik trafia na dysk (fsync)
+JOURNAL_COMPACT_THRESHOLD = 500     # po ilu rekordach dziennik jest składany do snapshotu
+
+journal_buffers = {}  # guild_id -> rekordy czekające na zapis do dziennika
+journal_sizes = {}    # guild_id -> liczba rekordów zapisanych od ostatniego snapshotu
+journal_seq = {}      # guild_id -> numer ostatniego rekordu
+
+def normalize_name(name):
+    """Klucz wyszukiwania nazwy: małe litery, bez nadmiarowych spacji ("Gwenpool " == "gwenpool")."""
+    return " ".join(name.split()).lower()
+
+RARITIES = ("Common", "Rare", "Epic", "Legendary")
+
+class Leaderboard:
+    """Ranking serwera aktualizowany przy każdej zmianie kolekcji.
+
+    counts trzyma dla użytkownika [łącznie, Common, Rare, Epic, Legendary],
+    a buckets grupuje użytkowników po liczbie postaci, więc top-K czytamy
+    od największego kubełka w dół, bez przeglądania kolekcji.
+    """
+
+    __slots__ = ("counts", "buckets", "best")
+
+    def __init__(self):
+        self.counts = {}
+        self.buckets = {}
+        self.best = 0
+
+    def update(self, user_id, rarity, delta):
+        counts = self.counts.get(user_id)
+        if counts is None:
+            counts = self.counts[user_id] = [0] * (len(RARITIES) + 1)
+        old_total = counts[0]
+        counts[0] += delta
+        if rarity in RARITIES:
+            counts[RARITIES.index(rarity) + 1] += delta
+
+        if old_total:
+            bucket = self.buckets[old_total]
+            del bucket[user_id]
+            if not bucket:
+                del self.buckets[old_total]
+        if counts[0]:
+            self.buckets.setdefault(counts[0], {})[user_id] = None
+        else:
+            del self.counts[user_id]
+
+        if counts[0] > self.best:
+            self.best = counts[0]
+        while self.best and self.best not in self.buckets:
+            self.best -= 1
+
+    def top(self, limit):
+        """Zwraca [(user_id, [łącznie, Common, Rare, Epic, Legendary])] malejąco."""
+        result = []
+        total = self.best
+        while total > 0 and len(result) < limit:
+            for user_id in self.buckets.get(total, ()):
+                result.append((user_id, self.counts[user_id]))
+                if len(result) >= limit:
+                    break
+            total -= 1
+        return result
+
+def leaderboard_summary(board):
+    """Zwraca (liczba kolekcjonerów, [łącznie, Common, Rare, Epic, Legendary]) dla rankingu serwera."""
+    totals = [0] * (len(RARITIES) + 1)
+    for counts in board.counts.values():
+        for i, count in enumerate(counts):
+            totals[i] += count
+    return len(board.counts), totals
+
+evicted_summaries = {}  # guild_id -> leaderboard_summary serwera wyrzuconego z pamięci (do statystyk)
+
+def build_collection_indexes(guild_id):
+    """Buduje indeksy nazw i ranking wszystkich kolekcji serwera (przy ładowaniu danych)."""
+    name_index[guild_id] = {}
+    prefix_index[guild_id] = {}
+    rarity_index[guild_id] = {}
+    collection_versions.setdefault(guild_id, {})  # wersje rosną dalej, więc stare strony się unieważnią
+    leaderboards[guild_id] = Leaderboard()
+    for user_id, chars in collections_of(guild_id).items():
+        for character_id in chars:
+            _index_add(guild_id, user_id, character_id)
+
+def _touch_collection(guild_id, user_id):
+    """Zmienia wersję kolekcji - unieważnia jej zapamiętane strony /collection."""
+    versions = collection_versions.setdefault(guild_id, {})
+    versions[user_id] = versions.get(user_id, 0) + 1
+
+def _index_add(guild_id, user_id, character_id):
+    character = get_character(character_id)
+    leaderboards.setdefault(guild_id, Leaderboard()).update(user_id, character["rarity"], 1)
+    rarity_index.setdefault(guild_id, {}).setdefault(user_id, {}).setdefault(character["rarity"], {})[character_id] = None
+    _touch_collection(guild_id, user_id)
+    key = normalize_name(character["name"])
+    names = name_index.setdefault(guild_id, {}).setdefault(user_id, {})
+    ids = names.get(key)
+    if ids is None:
+        names[key] = [character_id]
+        bisect.insort(prefix_index.setdefault(guild_id, {}).setdefault(user_id, []), key)
+    else:
+        ids.append(character_id)
+
+def _index_remove(guild_id, user_id, character_id):
+    character = get_character(character_id)
+    leaderboards[guild_id].update(user_id, character["rarity"], -1)
+    del rarity_index[guild_id][user_id][character["rarity"]][character_id]
+    _touch_collection(guild_id, user_id)
+    key = normalize_name(character["name"])
+    names = name_index[guild_id][user_id]
+    ids = names[key]
+    ids.remove(character_id)
+    if not ids:
+        del names[key]
+        prefixes = prefix_index[guild_id][user_id]
+        del prefixes[bisect.bisect_left(prefixes, key)]
+
+def owner_of(guild_id, character_id):
+    """Zwraca ID właściciela postaci na serwerze albo None."""
+    guild = ownership.get(guild_id)
+    return guild.owners.get(character_id) if guild else None
+
+def collection_of(guild_id, user_id):
+    """Zwraca kolekcję użytkownika {ID postaci: None} (pusty słownik, jeśli nic nie ma)."""
+    guild = ownership.get(guild_id)
+    return guild.collections.get(user_id, {}) if guild else {}
+
+def collections_of(guild_id):
+    """Zwraca kolekcje wszystkich użytkowników serwera: user_id -> {ID postaci: None}."""
+    guild = ownership.get(guild_id)
+    return guild.collections if guild else {}
+
+def add_owned(guild_id, user_id, character_id):
+    """Dodaje postać bez właściciela do kolekcji użytkownika i do indeksów; zwraca False, jeśli ktoś ją ma."""
+    if not ownership.setdefault(guild_id, Ownership()).add(user_id, character_id):
+        return False
+    _index_add(guild_id, user_id, character_id)
+    return True
+
+def remove_owned(guild_id, user_id, character_id):
+    """Usuwa postać z kolekcji użytkownika w O(1); zwraca False, jeśli jej nie miał."""
+    guild = ownership.get(guild_id)
+    if guild is None or not guild.remove(user_id, character_id):
+        return False
+    _index_remove(guild_id, user_id, character_id)
+    return True
+
+def move_owned(guild_id, from_id, to_id, character_id):
+    """Przenosi postać między kolekcjami (give/trade); zwraca False, jeśli from_id jej nie miał."""
+    if not remove_owned(guild_id, from_id, character_id):
+        return False
+    add_owned(guild_id, to_id, character_id)
+    return True
+
+def find_owned_id(guild_id, user_id, name):
+    """Zwraca ID posiadanej postaci o podanej nazwie albo None."""
+    ids = name_index.get(guild_id, {}).get(user_id, {}).get(normalize_name(name))
+    return ids[0] if ids else None
+
+def autocomplete_owned(guild_id, user_id, prefix, limit=25):
+    """Zwraca do `limit` nazw posiadanych postaci zaczynających się od prefix."""
+    prefix = normalize_name(prefix)
+    prefixes = prefix_index.get(guild_id, {}).get(user_id, [])
+    names = name_index[guild_id][user_id] if prefixes else {}
+    result = []
+    for key in prefixes[bisect.bisect_left(prefixes, prefix):]:
+        if not key.startswith(prefix) or len(result) >= limit:
+            break
+        result.append(get_character(names[key][0])["name"].strip())
+    return result
+
+def _record_character(guild_id, user_id, record, id_key, name_key):
+    """ID postaci z rekordu; starsze rekordy zawierały tylko nazwę."""
+    return record.get(id_key) or find_owned_id(guild_id, user_id, record.get(name_key, ""))
+
+def apply_record(guild_id, record):
+    """Nakłada jedną mutację (claim/give/remove/trade i ich wersje zbiorcze) na stan serwera w pamięci."""
+    op = record["op"]
+
+    if op == "claim":
+        # Stare dzienniki trzymały w rekordzie całą postać zamiast jej ID
+        character_id = record["id"] if "id" in record else upgrade_character(record["character"])
+        add_owned(guild_id, record["user"], character_id)
+        set_character_available(guild_id, character_id, False)
+        expiry_engine.cancel(guild_id, character_id)
+    elif op == "give":
+        character_id = _record_character(guild_id, record["from"], record, "id", "name")
+        if character_id:
+            move_owned(guild_id, record["from"], record["to"], character_id)
+    elif op == "remove":
+        character_id = _record_character(guild_id, record["user"], record, "id", "name")
+        if character_id and remove_owned(guild_id, record["user"], character_id):
+            set_character_available(guild_id, character_id, True)
+    elif op == "give_many":
+        # Paczka z /give_many: jeden rekord, więc po awarii wraca cała albo wcale
+        for character_id in record["ids"]:
+            move_owned(guild_id, record["from"], record["to"], character_id)
+    elif op == "remove_many":
+        for character_id in record["ids"]:
+            if remove_owned(guild_id, record["user"], character_id):
+                set_character_available(guild_id, character_id, True)
+    elif op == "reserve":
+        # Rezerwacja spawnu; po restarcie wygasłe rezerwacje po prostu nie wracają
+        if record["until"] > time.time() and owner_of(guild_id, record["id"]) is None:
+            expiry_engine.schedule(guild_id, record["id"], record["until"])
+            set_character_available(guild_id, record["id"], False)
+    elif op == "trade":
+        giver_char = _record_character(guild_id, record["giver"], record, "giver_id", "giver_name")
+        recipient_char = _record_character(guild_id, record["recipient"], record, "recipient_id", "recipient_name")
+        # Najpierw zabieramy obie postacie, żeby przy zamianie nikt nie miał ich naraz
+        giver_moved = giver_char and remove_owned(guild_id, record["giver"], giver_char)
+        recipient_moved = recipient_char and remove_owned(guild_id, record["recipient"], recipient_char)
+        if giver_moved:
+            add_owned(guild_id, record["recipient"], giver_char)
+        if recipient_moved:
+            add_owned(guild_id, record["giver"], recipient_char)
+    else:
+        log_event(logging.WARNING, "⚠️ Nieznany rekord dziennika", guild=guild_id, op=record.get("op"), seq=record.get("seq"))
 
+def find_character(guild_id, user_id, name):
+    """Zwraca postać (wpis katalogu) z kolekcji użytkownika albo None."""
+    character_id = find_owned_id(guild_id, user_id, name)
+    return get_character(character_id) if character_id else None
+
+def select_owned(guild_id, user_id, rarity="All", names=""):
+    """ID posiadanych postaci pasujących do filtra: rzadkość ("All" - każda) i opcjonalna lista nazw po przecinku."""
+    if rarity == "All":
+        ids = list(collection_of(guild_id, user_id))
+    else:
+        ids = list(rarity_index.get(guild_id, {}).get(user_id, {}).get(rarity, {}))
+    wanted = {normalize_name(name) for name in names.split(",") if name.strip()}
+    if wanted:
+        ids = [i for i in ids if normalize_name(get_character(i)["name"]) in wanted]
+    return ids
+
+def record_mutation(guild_id, record):
+    """Nakłada mutację w pamięci i dopisuje ją do bufora dziennika serwera."""
+    seq = journal_seq.get(guild_id, 0) + 1
+    journal_seq[guild_id] = seq
+    record["seq"] = seq
+    apply_record(guild_id, record)
+    journal_buffers.setdefault(guild_id, []).append(record)
+
+def encode_json(data):
+    """Zwarty JSON (bez wcięć) - szybszy do zapisu i odczytu niż pretty-print."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def write_file_atomic(path, text):
+    """Zapisuje plik przez plik tymczasowy, fsync i rename - przerwany zapis nie psuje starej wersji."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    # fsync katalogu utrwala samą zamianę nazwy (tam, gdzie system na to pozwala)
+    with contextlib.suppress(OSError):
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-            print(f"✅ Dane zapisane dla serwera {guild_id} w pliku {file_path}. Zawartość: {data_to_save}")
-        except Exception as e:
-            print(f"❌ Błąd zapisu danych dla serwera {guild_id}: {e}")
-            
-async def load_data(guild_id):
-    """Ładuje dane użytkowników i postaci dla danego serwera."""
-    async with data_lock:
-        os.makedirs(DATA_FOLDER, exist_ok=True)  # To tworzy folder, jeśli go nie ma
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+class JsonStorage:
+    """Snapshot w data/server_<id>.json i dziennik mutacji w data/server_<id>.journal.
+
+    Metody wykonują blokujące I/O - bot wywołuje je w wątku zapisów (run_storage).
+    """
+
+    def guild_ids(self):
+        """ID serwerów, które mają zapisany snapshot."""
+        guild_ids = []
+        for file_name in sorted(os.listdir(DATA_FOLDER)):
+            match = re.fullmatch(r"server_(\d+)\.json", file_name)
+            if match:
+                guild_ids.append(match.group(1))
+        return guild_ids
+
+    def load(self, guild_id):
+        """Zwraca snapshot serwera i rekordy dziennika, które trzeba na nim odtworzyć."""
         file_path = get_server_data_file(guild_id)
 
-        print(f"Sprawdzam plik dla serwera {guild_id}: {file_path}")
+        log_event(logging.DEBUG, "Sprawdzam plik serwera", guild=guild_id, path=file_path)
 
+        data = {}
         if not os.path.exists(file_path):
-            user_collection[guild_id] = {}
-            claimed_characters[guild_id] = {}
             try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump({"user_collection": {}, "claimed_characters": {}}, f, indent=4, ensure_ascii=False)
-                print(f"✅ Nowy plik stworzony dla serwera {guild_id}.")
+                write_file_atomic(file_path, encode_json({"user_collection": {}, "claimed_characters": {}}))
+                log_event(logging.INFO, "✅ Nowy plik serwera", guild=guild_id)
             except Exception as e:
-                print(f"❌ Błąd przy tworzeniu pliku dla serwera {guild_id}: {e}")
-            return
+                log_event(logging.ERROR, f"❌ Błąd przy tworzeniu pliku: {e}", guild=guild_id)
+        else:
+            # Nieczytelnego snapshotu nie zastępujemy pustym stanem - kolejny zapis
+            # nadpisałby kolekcje całego serwera. Plik zostaje do ręcznej naprawy.
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError as e:
+                log_event(logging.ERROR, f"❌ Uszkodzony snapshot, serwer nie zostanie załadowany: {e}", guild=guild_id, path=file_path)
+                raise
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                user_collection[guild_id] = data.get("user_collection", {})
-                claimed_characters[guild_id] = data.get("claimed_characters", {})
-
-            print(f"✅ Dane załadowane dla serwera {guild_id}.")
-        except json.JSONDecodeError:
-            print(f"⚠️ Błąd dekodowania JSON dla {guild_id}, inicjalizowanie pustych danych.")
-            user_collection[guild_id] = {}
-            claimed_characters[guild_id] = {}
-        except Exception as e:
-            print(f"⚠️ Błąd ładowania danych dla {guild_id}: {e}")
-            user_collection[guild_id] = {}
-            claimed_characters[guild_id] = {}
-
-characters = [
-    {"name": "Colossus", "image": "https://th.bing.com/th/id/R.d45dcdef66226486216bdab07cade13d?rik=%2bb%2fykXEYJirzBw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Ladypool", "image": "https://i.pinimg.com/736x/cc/41/97/cc41970b98ecb22db8f8b91862ddca35.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Skrull 1", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 2", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 3", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 4", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 5", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 6", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 7", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 8", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 9", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 10", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 11", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 12", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 13", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 14", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 15", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 16", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 17", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 18", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 19", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 20", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 21", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 22", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 23", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 24", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 25", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 26", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 27", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 28", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 29", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 30", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 31", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 32", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 33", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 34", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 35", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 36", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 37", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 38", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 39", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 40", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 41", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 42", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 43", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 44", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 45", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 46", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 47", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 48", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 49", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 50", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 51", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 52", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 53", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 54", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 55", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 56", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 57", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 58", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 59", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 60", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 61", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 62", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 63", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 64", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 65", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 66", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 67", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 68", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 69", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 70", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 71", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 72", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 73", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 74", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 75", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 76", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 77", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 78", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 79", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Skrull 80", "image": "https://i.pinimg.com/originals/27/a6/3f/27a63ffeebec26ff27411dc421b60173.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Frigga", "image": "https://th.bing.com/th/id/R.2683ea4d382c83fef7e072d069856f9a?rik=tcMKki6Ia2cJEQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Molecule Man", "image": "https://i.pinimg.com/736x/21/4f/75/214f7543f25bc9a0c68753658559066a--molecule-man-comic-superheroes.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Ajax", "image": "https://th.bing.com/th/id/OIP.tCZDEKam1rFqfORpcZJfRgAAAA?rs=1&pid=ImgDetMain", "raity": "Rare", "chance": 0.15},
-    {"name": "Alioth", "image": "https://www.dexerto.com/cdn-image/wp-content/uploads/2023/09/11/alioth-marvel-snap-featured.jpg?width=1200&quality=60&format=auto", "rarity": "Rare", "chance": 0.15},
-    {"name": "America Chavez", "image": "https://marvelblog.com/wp-content/uploads/2021/12/america-chavez.jpeg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Ammit", "image": "https://th.bing.com/th/id/OIP.dOJiXyumZuFvlzlJtRSflQHaN6?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Ancient One", "image": "https://th.bing.com/th/id/OIP.E4lms1O8Nk4Z7CS3zjis2AAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Anubis", "image": "https://th.bing.com/th/id/OIP.yuroaPNgUt0yFWJW0Mw5NQAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Armor", "image": "https://th.bing.com/th/id/OIP.xtSC7MrzfiR2dg7y5tILrgHaLP?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Aunt May", "image": "https://th.bing.com/th/id/OIP.67qE7OKSO5ICCy4_I0v2DgAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Baron Mordo", "image": "https://i.pinimg.com/originals/f7/a5/f6/f7a5f6a899bd2218acef2f9f24cadd07.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Beta Ray Bill", "image": "https://th.bing.com/th/id/OIP.EqqtHO7L-bcSPg7bP8sxQgHaLY?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Bishop", "image": "https://i.pinimg.com/736x/90/61/ee/9061ee4f552d35f2d563f518b2a9d681.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Black Swan", "image": "https://th.bing.com/th/id/OIP.EJl44Bukc9QdJkBjNtEOhQHaLc?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Blind Al", "image": "https://comicvine.gamespot.com/a/uploads/original/3/31666/3333410-blind%20al.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Blob", "image": "https://th.bing.com/th/id/R.74fe06a2b1a0738da3c6a5f673adbf43?rik=4y36gy9vziHLow&riu=http%3a%2f%2fvignette3.wikia.nocookie.net%2fmarveldatabase%2fimages%2f7%2f76%2fFrederick_Dukes_(Earth-616)_from_All-New_X-Men_Vol_2_5_001.jpg%2frevision%2flatest%3fcb%3d20160225042614&ehk=JY6KRGyITwkG%2fwQ9lMXp3I69%2be%2fbOZ3fYnzMjYo6oMU%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Cable", "image": "https://i.pinimg.com/originals/8c/a7/6d/8ca76da466892b5544e24a41675f7a37.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Cassandra Nova", "image": "https://i.pinimg.com/originals/25/60/58/256058ecf53687ec6293f45a29ac40d5.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Goose", "image": "https://th.bing.com/th/id/OIP.1kpp6uVV4mI4W73yIdxo1AHaLc?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Cloak", "image": "https://th.bing.com/th/id/OIP.FHm62wMHRDFYEpWMNOyejwHaJ7?rs=1&pid=ImgDetMain","rarity": "Common", "chance": 0.20},
-    {"name": "Dagger", "image": "https://th.bing.com/th/id/OIP.FdwKBDNMzcI4OMy2bcfEYgHaJo?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Cloak And Dagger", "image": "https://pre00.deviantart.net/cb8b/th/pre/i/2017/110/d/b/cloak_and_dagger_by_chickenzpunk-db6j529.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Corvus Glaive", "image": "https://th.bing.com/th/id/R.30884f31f37944c140bf03ef16f1fce7?rik=HNMQfmarkyfceQ&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Dakken", "image": "https://th.bing.com/th/id/OIP.cbSM9GAQP8gh3YAKWkIY7wHaLP?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Dazzler", "image": "https://th.bing.com/th/id/OIP.X5OkrIhKo1P_gCBEiSUvwQAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Deathlock", "image": "https://i.pinimg.com/originals/93/86/6a/93866a81174838a591e6920701e37083.png", "rarity": "Common", "chance": 0.20},
-    {"name": "Blue Marvel", "image": "https://static.tvtropes.org/pmwiki/pub/images/blue_marvel.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Cosmo", "image": "https://th.bing.com/th/id/OIP.4-bJJQNilVoom7R64YaSLgHaKH?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Zuras", "image": "https://i.pinimg.com/736x/cf/57/3f/cf573f8ebd4e12f76c4947faf007f19a.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ikaris", "image": "https://th.bing.com/th/id/OIP.b9ZnoWRLuH4-94xKSpXRlgHaLP?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Captain Canuck", "image": "https://comicvine.gamespot.com/a/uploads/original/1/10812/7742527-canuck.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Wonder Man", "image": "https://th.bing.com/th/id/R.4853603933ba0d02ef2c0b0670408056?rik=qXKUzsAoaiCg4w&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Carnage", "image": "https://th.bing.com/th/id/OIP.wOuuWsvrwUQH6rg2EcwunAHaLH?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Dogpool", "image": "https://static.tvtropes.org/pmwiki/pub/images/dogpool.png", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Franklin Richards", "image": "https://th.bing.com/th/id/OIP.RSyeALKvF5u2m51aGXeBqAAAAA?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Gwenpool ", "image": "https://comicvine.gamespot.com/a/uploads/scale_medium/6/67663/6633324-05-variant.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Valeria Richards", "image": "https://comicvine.gamespot.com/a/uploads/scale_small/11112/111123579/7033575-valeria_richards_%2528earth-616%2529_from_fantastic_four_vol_6_10_001.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Spider Gwen", "image": "https://2.bp.blogspot.com/-LnSMaUsKYCw/WKzox4pYimI/AAAAAAABM7Y/-W8DWqdnDgwWgr9QwSwEEGZFj7GjonFXwCLcB/s1600/spider_gwen_by_chickenzpunk-d9w2jar.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Sentry", "image": "https://th.bing.com/th/id/R.40ba3e2c0fd1e9c81a6de746cb87e0ef?rik=hk%2f9KffAbceFiA&riu=http%3a%2f%2fpm1.aminoapps.com%2f6565%2fa5eabcb59735277fcea3dab4aa01cf41024867d3_00.jpg&ehk=clvapp%2bWk8eL2M0VNT7gzZHTcvHNwGHWoo%2b0rhisEvw%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Iron Man", "image": "https://th.bing.com/th/id/OIP.KWzuNXbEfSmcBj7Vc_ZdzAHaLE?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Spider-Man", "image": "https://th.bing.com/th/id/R.6d5275caa41a9a7a496ad7e973d88939?rik=jYP6ATpyJVEXQw&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Thor", "image": "https://i.pinimg.com/originals/df/f1/dd/dff1ddc600819e5f1aa8e95a788d5584.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Hulk", "image": "https://i.pinimg.com/originals/4a/bc/a8/4abca8abdfda6359581be1153434266f.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Jeff the Land Shark", "image": "https://www.laughingplace.com/w/wp-content/uploads/2021/11/jeff-the-land-shark-gets-in-on-thanksgiving-fun-in-a-new-infinity-comic.jpeg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Red She Hulk", "image": "https://i.pinimg.com/originals/79/c4/fa/79c4faf96d00c4523c4f3872f5f7961f.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "The Rose", "image": "https://th.bing.com/th/id/OIP.yz_uF7X4-e6llZjkR7LWAQHaI-?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Scream", "image": "https://th.bing.com/th/id/R.3e9a2a5e4dab41121f1bcfb75596e64c?rik=HT%2fDSJYGMbkHLQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Scarlet Spider", "image": "https://th.bing.com/th/id/R.040fab53e158550216dfd80801da5c0e?rik=hOKTNWy5xxoDzA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Sandman", "image": "https://i.pinimg.com/736x/3e/87/8c/3e878cc8757509de5944eb1f65d65061.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Black Widow", "image": "https://artfiles.alphacoders.com/134/thumb-1920-134089.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Quick Silver", "image": "https://th.bing.com/th/id/OIP.BEqKKjRR-0a9hVNKkkYFkwHaLY?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "She Hulk", "image": "https://www.ixpap.com/images/2022/08/She-Hulk-Wallpaper-768x1365.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Speed", "image": "https://th.bing.com/th/id/OIP.EXGtvWk2aPsmlZ8GtPEPUgAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ikon", "image": "https://th.bing.com/th/id/R.a31892792de6d8d58aacc3f4f45281ba?rik=yuTzVwg34rkkSg&riu=http%3a%2f%2fimg1.wikia.nocookie.net%2f__cb20140117061457%2fmarveldatabase%2fimages%2f9%2f9c%2fIkon_(Earth-616)_from_Infinity_Vol_1_1_0002.jpg&ehk=1zuIW9yiSsYBG5m%2fP6CzMOBvABgytdMyd731Q9FGA3g%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Blackbolt", "image": "https://th.bing.com/th/id/R.a42416674ff68d73c56d7557a53ebe23?rik=ZX2ptM9122W6fA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Jigsaw", "image": "https://vignette.wikia.nocookie.net/marveldatabase/images/3/36/Billy_Russo_(Earth-616)_from_Punisher_Vol_8_9_001.jpg/revision/latest?cb=20160425134716", "rarity": "Rare", "chance": 0.15},
-    {"name": "Iceman", "image": "https://th.bing.com/th/id/R.5ba5f2fcd3a16b84f4095e1be79da04b?rik=hC%2bc5D396vjMLw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Apocalypse", "image": "https://i.pinimg.com/736x/6e/9e/7f/6e9e7fa73121ae64740d7a3725f1b9a2.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Atum", "image": "https://th.bing.com/th/id/OIP.I6tZdKbNLriY5-FxPTPFGgHaLY?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Banshee", "image": "https://comicvine.gamespot.com/a/uploads/scale_medium/10/100647/6876875-banshee.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Wiccan", "image": "https://th.bing.com/th/id/OIP.QtyteE45-LIDZUma_JckdAAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Shuri", "image": "https://th.bing.com/th/id/OIP.Rookmzfyn0EQtOGHH7gxVwHaLY?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Namor", "image": "https://i.pinimg.com/originals/91/d4/e8/91d4e814eabf9ec3a437a35f011263cf.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ronan", "image": "https://th.bing.com/th/id/OIP.xHJnd780Gci2tyJTLJm0NwHaLH?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Captain Marvel", "image": "https://th.bing.com/th/id/OIP.5b0Y4EefcXLBTyPq9kVxGAHaJ4?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Photon", "image": "https://th.bing.com/th/id/OIP.zRK28WhQxxujnsMCKwAUWQHaLS?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ms Marvel", "image": "https://th.bing.com/th/id/OIP.l_sfi9nI_H1yzecjTYjDaQHaLc?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Falcon", "image": "https://th.bing.com/th/id/R.16963ff2ee71feba4ccddf2f7a4d626c?rik=xCOrCK4pwD1ekA&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Doctor Strange", "image": "https://i.pinimg.com/474x/10/a7/b1/10a7b1800dbcc4829e1c1244149d33ae.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "White Widow", "image": "https://th.bing.com/th/id/OIP.KQeokmEc5pQw5ki6XSEKhQAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Domino", "image": "https://th.bing.com/th/id/OIP._0KI8RugK62z8biBvc8J0QHaMS?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Kraglin", "image": "https://th.bing.com/th/id/OIP.P7EtPB0dAm87NUi5zXSsIQAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Dracula", "image": "https://pm1.narvii.com/6478/6bfa48fe53c52100c09284d4338c8c609c85e7c8_hq.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Ebony Maw", "image": "https://th.bing.com/th/id/R.c969afb64e76495b71498e1a1a1eeacb?rik=%2fG5rzT3ZxEw7ZA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Maya Lopez", "image": "https://th.bing.com/th/id/OIP.P79Ny8V06bGMZGv5WHaxngHaLZ?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Ego", "image": "https://i.pinimg.com/originals/cc/36/ec/cc36ec43b1f3af22e289157940a334d4.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Elsa Bloodstone", "image": "https://th.bing.com/th/id/OIP.ijIjFQl-fFaQH8l3a1P6QwAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Enchantress", "image": "https://th.bing.com/th/id/R.f36fa34053fc64caea3528e08196fab0?rik=92GJi73O2a%2bzOw&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Killmonger", "image": "https://cdn.marvel.com/content/1x/black_panther_2018_19_king_killmonger.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Fin Fang Foom", "image": "https://i.pinimg.com/originals/d2/65/c1/d265c1a5eab1e3db1cce386b83c88028.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Forge", "image": "https://th.bing.com/th/id/R.66cc0a22965694df68ce85d03630e0ed?rik=O%2fPTXQTeZdhqJA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Freya", "image": "https://comicvine.gamespot.com/a/uploads/original/11174/111743093/8944511-1584993690-346.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Black Panther", "image": "https://th.bing.com/th/id/R.216461b194d3e1047b817b87a3b1c6f8?rik=Pq1FVVxB7n4Ttw&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Captain America", "image": "https://th.bing.com/th/id/R.75a03cc4f37b53acfa5e9b597dad2074?rik=tVyenelo9lPawA&riu=http%3a%2f%2ffc04.deviantart.net%2ffs70%2fi%2f2012%2f203%2f6%2f2%2fcaptain_america_by_asylumcomics-d5883ay.jpg&ehk=erNg0BQzIkQ0ZnLhwhAzBx0iuYI7QCFIsWodrD6%2bfGI%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Scarlet Witch", "image": "https://th.bing.com/th/id/R.4757b3aa9482ad9ce69cf549f9e4b2e2?rik=c2b4Z7VocXmtog&riu=http%3a%2f%2fcomichomeworld.com%2fwp-content%2fuploads%2f2017%2f02%2fSW.jpg&ehk=S%2fVyJwnAMl5MnIxK%2fN2uNIdU8fNBVY8bL0WpFkF%2bGLc%3d&risl=&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Deadpool", "image": "https://2.bp.blogspot.com/WP0bDIVX4x69MytzjdWErt9ECmVz8vFdFTDmf-iKGtqdw_zok6x_43uph97uV9mN1WRoXAgun7A=s0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Loki", "image": "https://th.bing.com/th/id/R.5364760e864cd36df5fb8fa4389fcf06?rik=sQ69xii57%2f5tkA&riu=http%3a%2f%2fimages6.fanpop.com%2fimage%2fphotos%2f43700000%2f-Loki-marvel-comics-43724754-1296-1797.jpg&ehk=fo36%2f%2fdSj9rvq3%2bbS%2fGuAPFlRBuadp5S8OfYiqOMt1Q%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Thanos", "image": "https://th.bing.com/th/id/OIP.kt5nmgsNe9FnVkZ6qp5Y5QHaLP?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Venom", "image": "https://static.tvtropes.org/pmwiki/pub/images/venom2018001_cov.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "The Watcher", "image": "https://i.pinimg.com/736x/42/e3/75/42e3755e10f0375852352cf830c64df0.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Wolverine", "image": "https://th.bing.com/th/id/R.0ea97367eacbc4c66b8c88a5061fcade?rik=KWGmcZPXA2xx3Q&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Magneto", "image": "https://th.bing.com/th/id/OIP.yu3iyvGzm3Wsrr9p2ZIYkAHaLJ?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Storm", "image": "https://i.pinimg.com/originals/ea/c2/d0/eac2d00bd069b9bb981ee78bd90eb578.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Destroyer", "image": "https://th.bing.com/th/id/R.50f932bb468f082b47b13c3229d67988?rik=1Xvh3c%2faqx0AoA&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Jean Grey", "image": "https://th.bing.com/th/id/R.8b4b0ca977aa1eeaea06b21c937e8c1a?rik=eG0I8DS1kXRDIg&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Taweret", "image": "https://th.bing.com/th/id/OIP.j5DNQh9Xvz6w91nMgNCVYQAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "John Walker", "image": "https://th.bing.com/th/id/R.79140a7bf2b12cccfc003695e2902a62?rik=sGp0t6IRDfGc7A&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Valkyrie", "image": "https://th.bing.com/th/id/R.79da9ae41bee6f27028fff8ebb4609a1?rik=zeOVmn%2bJm8wShQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Vanessa Fisk", "image": "https://th.bing.com/th/id/OIP.6vsVHw1pNWWysY7M5RTqKgAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Viper", "image": "https://i.pinimg.com/originals/cd/2f/f0/cd2ff09ee13463e865dd74b64d5ead70.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Volstagg", "image": "https://th.bing.com/th/id/R.a59746e3633ab7a76dcf9afb256b690d?rik=No123b5gwMD1cw&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Crystal", "image": "https://vignette.wikia.nocookie.net/p__/images/9/97/War_of_Kings_Warriors_Vol_1_2_Textless.jpg/revision/latest?cb=20150111192413&path-prefix=protagonist", "rarity": "Rare", "chance": 0.15},
-    {"name": "Nick Fury", "image": "https://comicvine.gamespot.com/a/uploads/scale_small/12/124259/8820211-ezgif-1-a0ae1e5c49.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Agent Carter", "image": "https://vignette.wikia.nocookie.net/wwcbm/images/3/3f/Peggy_Carter_comics_crop.jpg/revision/latest?cb=20170929184713", "rarity": "Common", "chance": 0.20},
-    {"name": "Captain Britain", "image": "https://th.bing.com/th/id/OIP.eoITQ3oYQQveiVx-VYTAnwHaLK?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Cyclops", "image": "https://th.bing.com/th/id/OIP.Zreosut-e2RCHUiNpBad5gHaLP?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Rogue", "image": "https://th.bing.com/th/id/OIP.rkiSQE-DWDQNCi2TO8rnfgHaLU?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Gambit", "image": "https://i.pinimg.com/originals/7b/76/90/7b7690f4b4f58babec4b1939a6b0955e.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Beast", "image": "https://i.pinimg.com/originals/f4/ea/b8/f4eab830c1d4a229a39060c347fa7b8f.png", "rarity": "Rare", "chance": 0.15},
-    {"name": "Benjamin Parker", "image": "https://vignette.wikia.nocookie.net/marveldatabase/images/8/89/Benjamin_Parker_(Earth-11638)_from_Amazing_Spider-Man_Annual_Vol_1_38_0001.jpg/revision/latest?cb=20110426053122", "rarity": "Common", "chance": 0.20},
-    {"name": "Ben Urich", "image": "https://th.bing.com/th/id/R.54b285107d0cd6d26e7ef8019a74e95d?rik=R7Fx1a6P99NHsg&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Beyonder", "image": "https://th.bing.com/th/id/R.94bae2dac53bc831eb0eecec2f1f0d36?rik=LOFXLf9Y11w44A&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Black Dwarf", "image": "https://th.bing.com/th/id/OIP.6pXSsWEsgVNmXrgWWrXoTwAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Blink", "image": "https://th.bing.com/th/id/R.d53dfc8bf305ada46373241f66c3d46b?rik=7zi2ZcdMW3fAMw&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Collen Wing", "image": "https://www.tebeosfera.com/T3content/img/T3_personajes/7/4/collen_wing_marvel_1974.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "The Collector", "image": "https://th.bing.com/th/id/R.ae29e6f41ce4e7e1b1f938608f5cf6dd?rik=LGgZBGjY%2fMUCkQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Corvus Glaive", "image": "https://vignette.wikia.nocookie.net/wwcbm/images/9/9e/Corvus_Glaive_comics_crop.jpg/revision/latest?cb=20171113172907", "rarity": "Common", "chance": 0.20},
-    {"name": "Nightcrawler", "image": "https://th.bing.com/th/id/OIP.9PULv7rjEJZHZ3HvkwN45QHaLP?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Juggernaut", "image": "https://th.bing.com/th/id/OIP.UHL6LngNsSkOBRcWT6n7awHaLd?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Kang the Conqueror", "image": "https://i.pinimg.com/736x/0d/43/70/0d4370ffc5084c5a4f9fed604d008461.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Khonshu", "image": "https://th.bing.com/th/id/OIP.qBcwldcqFmEfD9wTvIVfjwHaKe?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Knull", "image": "https://i.pinimg.com/736x/22/10/06/22100649ac60489e20ac5901d0c0a24a.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Psylocke", "image": "https://th.bing.com/th/id/OIP.3CMB8XOdURN5CoiByS2HbQHaK0?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Legion", "image": "https://th.bing.com/th/id/OIP.QW-FB0o5lwB1h4ismnYZGwAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Lilith", "image": "https://i.pinimg.com/736x/9c/1f/e0/9c1fe0189f0ebd40d4b99cffd585be39.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Luna Snow", "image": "https://cdn.marvel.com/content/1x/future_fight_firsts_luna_snow_2019_1.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "M.O.D.O.K", "image": "https://th.bing.com/th/id/R.8a893496d14f00a94fb1a848bb861894?rik=5RAB3mLbRzMAnA&riu=http%3a%2f%2f1.bp.blogspot.com%2f-h0B25SPWusM%2fVTHPpbr7QFI%2fAAAAAAAAJ38%2f6zq_QfGsIik%2fs1600%2fDavid_Finch_-_MODOK_vs._Hulks.jpg&ehk=eJahJmDQES%2bsjNOKpqhUiZy%2bSSdNX4U7Kf8l8N6MwA8%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Madam Web", "image": "https://th.bing.com/th/id/OIP.ZCkK0tR3jBG47K7BcfPlcAAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Madelyne Pryor", "image": "https://i.pinimg.com/736x/4f/e9/b9/4fe9b94dd8dccebcd002452ade913269.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Man Thing", "image": "https://i.pinimg.com/originals/51/99/0f/51990f4f8d3a30ced07a54904c1817d2.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Medusa", "image": "https://i.pinimg.com/originals/09/a0/9e/09a09ed8afea25848495db7461866927.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Korg", "image": "https://th.bing.com/th/id/OIP.BK7I7YG1W7AFG-Hz0K73mAHaKn?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Professor X", "image": "https://th.bing.com/th/id/OIP.tSUFl0CKErOXAUf8f_AaCAAAAA?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Silver Surfer", "image": "https://th.bing.com/th/id/R.917963c584a3c94ef01605176bb5fbd0?rik=eaLSckEkdVsv9g&riu=http%3a%2f%2fimg3.wikia.nocookie.net%2f__cb20140502162102%2fmarvel-comics%2fde%2fimages%2f9%2f92%2fSilver_Surfer.jpg&ehk=iJWo5VEYHG2Hdfip1HRc8NJvXfEXAQRvE7Uq42JpQJ0%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Daredevil", "image": "https://th.bing.com/th/id/OIP.-iE_v4Oiyvt1MjTotKzuSAHaLY?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Daredevil (Black Suit)", "image": "https://i.pinimg.com/originals/21/53/fa/2153fa707711e553f25807f93a0b78f1.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Jessica Jones", "image": "https://th.bing.com/th/id/OIP.ldvaxk9BlAeQbXbdMVM8GwHaLQ?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "The Punisher", "image": "https://th.bing.com/th/id/R.9c1bd5785a4aa44999e437a3f1a48b66?rik=PlTpxqd03qvKhg&riu=http%3a%2f%2fdiskingdom.com%2fwp-content%2fuploads%2f2015%2f10%2fThe_Punisher_1_Maleev_Variant.jpg&ehk=120N7V3a8Zo0D%2ff7OQaNqYgMUcRG%2fKQ6%2fhC9UDkrCqo%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Ghost Rider", "image": "https://wallpaperaccess.com/full/2981574.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Wasp", "image": "https://vignette.wikia.nocookie.net/powerlisting/images/d/d5/Janet_van_Dyne_(Earth-616).jpg/revision/latest?cb=20140719054808", "rarity": "Rare", "chance": 0.15},
-    {"name": "Giant Man", "image": "https://i.pinimg.com/474x/40/58/06/405806614d342546de2aa8f69d298ffc--hank-pym-marvel-heroes.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Moon Knight", "image": "https://th.bing.com/th/id/OIP.3xA6NVPzPJTa6Mbm_uhETQHaLN?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Hawkeye", "image": "https://th.bing.com/th/id/OIP.qo_STSI-fdo6LwXo_J72eAHaJ8?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ant-Man", "image": "https://th.bing.com/th/id/R.8d79c19f3b6069d4f33c65f84898a965?rik=KomONd5EmGjlwg&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Vision", "image": "https://th.bing.com/th/id/R.3fd34e23eebe0d0d4f53a45c8165c4d1?rik=3bQ26P8N8qNVjQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Black Cat", "image": "https://i.pinimg.com/originals/82/19/0b/82190ba09b417aaebec1c8d8b83f0818.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Shang-Chi", "image": "https://i.pinimg.com/originals/19/16/5f/19165f71679bc2d444ef286d9e15506b.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Star-Lord", "image": "https://i.pinimg.com/originals/c9/98/1a/c9981adfe6ac7f8f5489528320e8483b.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Gamora", "image": "https://thecomicbooksanctum.files.wordpress.com/2023/04/gamora_zen_whoberi_ben_titan_28earth-752829_from_guardians_of_the_galaxy_vol_6_13_cover_001.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Rocket Raccoon", "image": "https://th.bing.com/th/id/OIP.z1yl8yEqh2BibTY7DudtSQHaLY?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Groot", "image": "https://th.bing.com/th/id/OIP.2EslN_kzhMuQKo1eHrxPqQHaLP?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Sprite", "image": "https://th.bing.com/th/id/OIP.4Fs5KJg5ewyGXWfo1r4xRAAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ajak", "image": "https://th.bing.com/th/id/OIP.14UgIO217HwKWXrRXgnNLAAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Sersi", "image": "https://th.bing.com/th/id/OIP.xRkNpBJfMJc3kKdqjlx_hQHaLb?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Makkari", "image": "https://thecomicbooksanctum.com/wp-content/uploads/2021/11/makkari_earth-616_from_eternals_celestia_vol_1_1_blake_variant.jpg?w=480", "rarity": "Epic", "chance": 0.05},
-    {"name": "Thena", "image": "https://i.pinimg.com/originals/32/e7/bf/32e7bf68e95b1ae0e933e9fcc80ce64a.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Domo", "image": "https://th.bing.com/th/id/OIP.3pq4zKaUx2VAkU3sWr5BSAAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Phastos", "image": "https://th.bing.com/th/id/R.63428a265cab66c1e1456d11a22da9cc?rik=6JrWvKXdhenYYQ&riu=http%3a%2f%2fimg1.wikia.nocookie.net%2f__cb20130619065805%2fmarveldatabase%2fimages%2fa%2fa7%2fPhastos_(Earth-616)_from_X-Men_Vol_3_14.jpg&ehk=4jldvP95UQqBO%2fYIRHb6ddihZQDwlSFn10or0sxS6wM%3d&risl=&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Druig", "image": "https://th.bing.com/th/id/OIP.B01YgyJ7XmWsfqYfZ5bzIAHaLX?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Drax", "image": "https://i.pinimg.com/originals/f9/fc/1f/f9fc1f7e53bd79a8f5c54b319ddf7030.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Nebula", "image": "https://th.bing.com/th/id/R.3219741d343b742eb7a642f83a2b2e7b?rik=nTlYfujHM6QzIQ&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Winter Soldier", "image": "https://i.pinimg.com/originals/2e/96/ee/2e96ee5904f3dff8b4e28751e37dc79c.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Mantis", "image": "https://th.bing.com/th/id/OIP.1-GMJcSSZC7RJKyjlUmTEAAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Doctor Doom", "image": "https://th.bing.com/th/id/R.8f12d6ee4d3f623112aafc1786ad2380?rik=Vy397KXUILOb8w&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Green Goblin", "image": "https://th.bing.com/th/id/R.a2a47e04eeccc870e39640d957919b6a?rik=7XKnL6hzUn637g&riu=http%3a%2f%2f3.bp.blogspot.com%2f-AU_L34EEHjI%2fVb1ZJNme3DI%2fAAAAAAAAhx8%2f1UsaK-oIl_I%2fs1600%2f74f6d8baaa80ea32fb7206e4055064e0.jpg&ehk=iSEEQ%2f8umBNywKHgcGvwZXo0yunimm8ZlwQyP6ynUUE%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Kingpin", "image": "https://th.bing.com/th/id/OIP.2Ps9Z3HjVq8kEqP-4RKGngHaNn?w=1232&h=2264&rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Ultron", "image": "https://freshcomics.s3.amazonaws.com/issue_covers/JAN130630_2.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Baron Zemo", "image": "https://th.bing.com/th/id/R.6c9b260a4831c287e560b640c397064f?rik=D%2fFABfX82myUYg&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Red Skull", "image": "https://th.bing.com/th/id/R.aa36d5bb3b9cffad5b79d1469b86819d?rik=rZvpPslACHHz7A&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Taskmaster", "image": "https://comicvine.gamespot.com/a/uploads/scale_medium/12/124259/8175165-screenshot2021-09-29201322.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Electro", "image": "https://th.bing.com/th/id/OIP.KYVrJ8Zo6OKtFLazIen-eQHaJL?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Rhino", "image": "https://comicvine.gamespot.com/a/uploads/scale_medium/12/124259/8059019-amazing_spider-man_vol_5_14_textless.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Vulture", "image": "https://th.bing.com/th/id/R.e9d1dc3a68da292be730df3328e22a11?rik=IjiGHOCZwnNTBw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "War Machine", "image": "https://th.bing.com/th/id/OIP.KHt25Ilb1tE_3um8QKB5YgHaLP?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Werewolf by Night", "image": "https://th.bing.com/th/id/OIP.rvVpzZclQRg10TlYEGjUqQHaLP?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Yondu", "image": "https://th.bing.com/th/id/R.e43715ecd1a3ee1e4969b64483d6b37d?rik=2an1H7eKtZc1DA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Itsy Bitsy", "image": "https://th.bing.com/th/id/R.7e814a4b0628575bf037ba2deac33cbe?rik=Hk7vcSNZYJxzmA&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Wolfsbane", "image": "https://th.bing.com/th/id/R.64ee3a572a5b0ad05b3f923f7f5c207a?rik=gABr91Xm3%2b09xw&riu=http%3a%2f%2fvignette4.wikia.nocookie.net%2fmarveldatabase%2fimages%2fc%2fcb%2fRahne_Sinclair_(Earth-616)_from_X-Factor_Vol_1_258.jpg%2frevision%2flatest%3fcb%3d20130618173349&ehk=fqaVjQfedMVqGMbI3m5Fp6LeBzqLJ7v9n2OV8VWEA70%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Shocker", "image": "https://th.bing.com/th/id/OIP.NAmXymrupnddfXTjc9jO3AHaLH?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Scorpion", "image": "https://th.bing.com/th/id/OIP.WKzcU3IT6_pTnYGL5eq9AwHaLZ?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Agent 13", "image": "https://i.pinimg.com/originals/d9/ca/84/d9ca8405f9bb09498bf038bda9f731b0.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Sif", "image": "https://th.bing.com/th/id/OIP.fb3N6UJ2_DYBlcrjlFvfTgHaLh?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Silk", "image": "https://th.bing.com/th/id/R.0c705536d393bcfff8ee619f464ded06?rik=xI%2butE90f8xHgA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Captain America (Sam Wilson)", "image": "https://i.pinimg.com/736x/06/37/c9/0637c95ab18313c213a1172f252c36d5--comic-books-comic-art.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Singularity", "image": "https://comicvine.gamespot.com/a/uploads/scale_medium/6/62795/5124971-singularity.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Old Man Logan", "image": "https://th.bing.com/th/id/OIP.5BtISVFMC5TrdFlZM5EqQQHaLc?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Wolverine (Age of Apocalypse)", "image": "https://i.pinimg.com/originals/db/61/d5/db61d50efd2b870909ffc912a3068eda.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Deadpool 2099", "image": "https://th.bing.com/th/id/R.efef7e5023ebca1731793d053d0873ec?rik=z1mj7NST8mJrcA&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Weapon X", "image": "https://th.bing.com/th/id/R.2dd4547064cfca7444829616d8c177f8?rik=oSixlGf4tApnCg&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Ultimate Thor", "image": "https://th.bing.com/th/id/R.a17d8ec18b1dbea896193694edb7bf0e?rik=BvUVazZCK48SHQ&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "King Thor", "image": "https://th.bing.com/th/id/OIP.YRSjaRS7cDyBCqgANJGNQAHaLQ?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Cosmic King Thor", "image": "https://i.pinimg.com/736x/01/63/26/01632613e4fdc9932ff85c8e757c9965.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Black Knight", "image": "https://th.bing.com/th/id/OIP.q-6O8SKljM8MPFEKWe9CbQAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Poison Wolverine", "image": "https://th.bing.com/th/id/R.f1fe73d007a5c6d1b11e8fcd529aafb7?rik=wjvAs0UyBv%2b8wg&riu=http%3a%2f%2fwww.marvunapp.com%2fAppendix8%2fearth17952poiswolv1.jpg&ehk=VstrgJCbvKs0hJJSCxTPyTpiW%2br5v5l73jAqoD5hQMU%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Wolverine Patch", "image": "https://th.bing.com/th/id/OIP.MZjKAoNxCFYtKsmLBBqsyQHaLP?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Mr.Knight", "image": "https://th.bing.com/th/id/R.99f46f932365c1db263f2d4766571070?rik=AvErdWRnvVaGCA&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Moon Knight 2099", "image": "https://comicvine.gamespot.com/a/uploads/scale_small/6/67344/1781928-880788_moon_knight_super.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Bruce Banner", "image": "https://th.bing.com/th/id/OIP.kqAlFuT_cQGgD0j3s9lWyAHaKl?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "The Punisher 2099", "image": "https://i.pinimg.com/originals/ba/ff/d8/baffd8bc1f0b52c39662d5d8c95c4489.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "The Punisher (MAX Universe)", "image": "https://th.bing.com/th/id/R.2356c24641dea03d87e9ef41d9a5dcb9?rik=ZJ7wDX6ONoWZzQ&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Elektra (Daredevil)", "image": "https://th.bing.com/th/id/R.93ad92a8cc4be2c85b45a55418a3a800?rik=L9u6DimZoVhXIQ&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Shelton Pendergrass", "image": "https://static.wikia.nocookie.net/marveldatabase/images/9/9f/Shelton_Pendergrass_%28Earth-200111%29_from_Punishermax_Vol_1_9_001.jpg/revision/latest?cb=20110417014254", "rarity": "Epic", "chance": 0.05},
-    {"name": "Deadpool Ultimate", "image": "https://th.bing.com/th/id/R.a47f274311c6b3a7f7f34e8333289688?rik=Fwe%2f1TFuaMTASw&riu=http%3a%2f%2fimages4.fanpop.com%2fimage%2fphotos%2f14700000%2fDeadpool-marvel-comics-14714060-550-824.jpg&ehk=NkabP8S2lkAOXa%2b5KC22po0mifs9P3cK6TicJoWaWNg%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Ronin", "image": "https://th.bing.com/th/id/OIP.21j2Y43uUYtUbCZSz8ACsQHaM_?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Hulkbuster", "image": "https://th.bing.com/th/id/OIP.dzB9YHWL75-qozw5aB9KjAHaLY?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ultimate Iron Man", "image": "https://th.bing.com/th/id/R.73ad6c9f304a787f096f7fd9a6ac56de?rik=e8mJ5dztYSkv7Q&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Superior Iron Man", "image": "https://th.bing.com/th/id/OIP.55-QMdXaw4603ot3tjZe4AHaKX?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Iron Hammer", "image": "https://i.pinimg.com/736x/48/75/ae/4875ae00e6a4bae05b5d21482acd2375.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Skarr", "image": "https://th.bing.com/th/id/OIP.InHChk2GtfIK6N-pkRS1WQAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Spider Women", "image": "https://vignette.wikia.nocookie.net/marveldatabase/images/5/50/Spider_Woman_01.jpg/revision/latest?cb=20140812143603", "rarity": "Common", "chance": 0.20},
-    {"name": "Spider Man (Miles Morales)", "image": "https://th.bing.com/th/id/R.0fc2cb7d17d0b6c92350600754f93ba8?rik=0529tnYKJ%2f15bA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Spider Man 2099", "image": "https://th.bing.com/th/id/R.0fc2cb7d17d0b6c92350600754f93ba8?rik=0529tnYKJ%2f15bA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Spider Man Noir", "image": "https://th.bing.com/th/id/R.92e6816a86885cb3f4fb0e4a0790cdd7?rik=O7BgGeP9qOnyCQ&riu=http%3a%2f%2fimg2.wikia.nocookie.net%2f__cb20140825064601%2fmarveldatabase%2fimages%2fc%2fc3%2fEdge_of_Spider-Verse_Vol_1_1_Textless.jpg&ehk=WM3u0BxW%2f%2b64amVQXnM3T1MQjoLH1YdvMtXdBRkQHFg%3d&risl=&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Spider Punk", "image": "https://th.bing.com/th/id/R.062bc25c44d87f3a159e3abe77e53e47?rik=CoQjn8fCU8zkiQ&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Lady Loki", "image": "https://i.pinimg.com/736x/d4/3a/8d/d43a8dfdfefc09a1dd23ae638e498bfa--loki-marvel-thor.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Hela", "image": "https://th.bing.com/th/id/OIP.D-mmKK6U7_rxwPEbJ0IWbQHaLc?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Dormammu", "image": "https://th.bing.com/th/id/R.c8caebe3e7e449a03abe5fe8f350d0ab?rik=6xjVc1ptsHvQ2A&riu=http%3a%2f%2f2.bp.blogspot.com%2f-z-q3f3PU1Lw%2fVSv7BBzB4jI%2fAAAAAAAAHf8%2flp7ooYGHZHo%2fs1600%2fdormammu_wallpaper_by_amrock-d496r1s.jpg&ehk=WgN97NaaKNCZ9vEyaxIMgkdIiENRbWENGKNLherNkco%3d&risl=&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Bullseye", "image": "https://th.bing.com/th/id/R.4c84e4e2a3e757af2aa4010439fbbe5a?rik=Tg60J1ljuTWhyg&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Kraven the Hunter", "image": "https://i.pinimg.com/originals/34/27/5b/34275b89630f7ed24837f05c3bfa1168.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Sabretooth", "image": "https://th.bing.com/th/id/R.6ba98bee54412f73e24619fad8e9dbcc?rik=gvn1%2bunoujSnSw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Mysterio", "image": "https://th.bing.com/th/id/R.254b165598621dcbca679036f9ae733b?rik=CBdIG8SRTBFVIg&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Morbius", "image": "https://th.bing.com/th/id/R.4ec11e7c70abb15fc4705ceb89b26abc?rik=K%2bkSVjEhXZOBZA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Blade", "image": "https://i.redd.it/jt743emacgb41.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Morbius", "image": "https://th.bing.com/th/id/OIP.vgmrU9IL6uBuGBzTdUh8tQHaLH?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Morgan Le Fay", "image": "https://th.bing.com/th/id/OIP.xcSjeA8D-VQEjYgXgFQ81QHaK1?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Morbius", "image": "https://vignette.wikia.nocookie.net/marveldatabase/images/e/e9/Muse_%28Earth-616%29_from_Daredevil_Vol_5_11_001.jpg/revision/latest?cb=20160910221816", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Mystique", "image": "https://th.bing.com/th/id/OIP.MprsXtM6zEKeUYkGUHbJMAHaNK?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Okoye", "image": "https://i.pinimg.com/736x/67/98/fa/6798faa367d6269e4cc8719d65ad2eca.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Onslaughter", "image": "https://th.bing.com/th/id/OIP.a4jDUuyoNJfaBbupSrxKOAHaKl?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Pepper Potts", "image": "https://i.pinimg.com/736x/67/98/fa/6798faa367d6269e4cc8719d65ad2eca.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Polaris", "image": "https://th.bing.com/th/id/R.d4f8b7763bea4399db22afde5fdc8e50?rik=BymtWrtbcO7RQA&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Proxima Midnight", "image": "https://th.bing.com/th/id/OIP.8P4o2-ehXfx1aSypT-7eaAHaKj?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Agent Coulson", "image": "https://th.bing.com/th/id/R.73fc9dc973f0c14b720d737582a5e6ba?rik=yx%2fVTGzU5KvalQ&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Odin", "image": "https://th.bing.com/th/id/R.f0531d46c75ad4b6e432683c70d8e5ed?rik=9cY0csoJnY8MGQ&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Negasonic Teenage Warhead", "image": "https://th.bing.com/th/id/OIP.mqYsVDpxec729GgcD5p_LgAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Angela", "image": "https://th.bing.com/th/id/R.39c3efaea259c84e5f858595284b6cbe?rik=5sRJaUMeh7pvrw&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Galactus", "image": "https://i.pinimg.com/originals/e3/24/51/e32451becf7825fb4d32fb130600bd98.jpg", "rarity": "Legendary", "chance": 0.02},
-    {"name": "X-23", "image": "https://th.bing.com/th/id/OIP.YIBZRKI9f0WfF3R8K6u5OQHaLG?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Elektra", "image": "https://orig00.deviantart.net/94bd/f/2015/187/5/a/elektra_by_j_skipper-d906raj.png", "rarity": "Epic", "chance": 0.05},
-    {"name": "Magik", "image": "https://i.pinimg.com/originals/e7/7b/ac/e77bacfcf2d24b19cfc0100df69f1a50.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Iron Fist", "image": "https://th.bing.com/th/id/R.7364579ca55a32e6456c67a2702797e8?rik=3a2BrSd7yw7K%2bg&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "Ghost", "image": "https://th.bing.com/th/id/R.0ad6206df17199e6209782a28955ea2f?rik=7F4JPi8sGcHOJA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Gorr", "image": "https://th.bing.com/th/id/OIP.Lv7axnFI0LNTv5pZyfEPKAHaJ8?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Grandmaster", "image": "https://th.bing.com/th/id/R.42742ba014003a60703f853b86c6d2db?rik=cEE68Sx4pgh1Wg&riu=http%3a%2f%2fimages1.wikia.nocookie.net%2f__cb20120123231828%2fmarveldatabase%2fimages%2f4%2f4a%2fEn_Dwi_Gast_(Earth-616)_from_Avengers_JLA_Vol_1_1.JPG&ehk=xXQJgF6f45cOZlQlrQLIg%2bFtZ07Dn1VQ4acOp3Vkzjc%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Happy Hogan", "image": "https://alchetron.com/cdn/happy-hogan-comics-868c3a27-a77b-40dd-9c7a-fd03e06a982-resize-750.jpg", "rarity": "Common", "chance": 0.20},
-    {"name": "Hercules", "image": "https://th.bing.com/th/id/R.b39dff71721fa6aa48de0d8ae143c578?rik=x11WEkSpEQWUcw&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "High Evolutionary", "image": "https://th.bing.com/th/id/R.6f56eaffb6dc0aaa9c950a6ee2c7a329?rik=Lt%2bR%2bgIX6aUmXw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Luke Cage", "image": "https://th.bing.com/th/id/OIP.VQQIXTNWBrdg0F-Uz-3e1gHaLP?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Kate Bishop", "image": "https://th.bing.com/th/id/OIP.is8ae6rRekqPoFSMG7pBAgAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Doctor Octopus", "image": "https://th.bing.com/th/id/OIP.Vo3mpp0u3bP0Mos6RZsFtAAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Lady Thor", "image": "https://th.bing.com/th/id/OIP.i8PWFgrmjq-rZ8Kuv056QQAAAA?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Lady Death", "image": "https://th.bing.com/th/id/OIP.j9Z4aoJ4GNIG0iDA2rwDlwAAAA?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Squirrel Girl", "image": "https://i.pinimg.com/originals/31/04/c5/3104c59d38110a11b3bf35c24bd25068.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Hellcat", "image": "https://i.pinimg.com/originals/5c/6a/bb/5c6abb936b212e8899fa49d6dd3185da.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "NorthStar", "image": "https://i.pinimg.com/originals/66/c4/70/66c4704583b875c6933296de905325fc.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "Nova", "image": "https://i.pinimg.com/736x/44/f3/0d/44f30df9ce035bd9624bf13f8afea673.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Kristen McDuffie", "image": "https://th.bing.com/th/id/R.0902447043dc097640408e626baa6e69?rik=AHrpN52WnnmhvA&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Red Hulk", "image": "https://th.bing.com/th/id/OIP.Y1ttPNTZedQIymWGh6wAPQHaLP?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Karen Page", "image": "https://th.bing.com/th/id/OIP.hG-gA4QX4lyAVw6sa4-D3gHaOZ?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Foggy Nelson", "image": "https://th.bing.com/th/id/OIP.e9FCrGhCHv5tISeJOvLXFgAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "White Tiger (Ava Ayala)", "image": "https://th.bing.com/th/id/OIP.HgFVNmz9dZlpmjQCuLK1UAAAAA?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "White Tiger (Hector Ayala)", "image": "https://th.bing.com/th/id/R.22f92847c233d5156a2a25a14c19580e?rik=c4l8XjYkMByYBw&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "White Wolf", "image": "https://assets.mycast.io/characters/white-wolf-366581-normal.jpg?1574492364", "rarity": "Rare", "chance": 0.15},
-    {"name": "White Tiger (Angela Del Toro)", "image": "https://www.writeups.org/wp-content/uploads/White-Tiger-Marvel-Comics-Angela-del-Toro-v.jpg", "rarity": "Rare", "chance": 0.15},
-    {"name": "White Fox", "image": "https://th.bing.com/th/id/R.ed035fce2802620da2149f4ecf199d01?rik=ab0trzkJ16xiZg&pid=ImgRaw&r=0", "rarity": "Rare", "chance": 0.15},
-    {"name": "Daredevil (Shadowland)", "image": "https://th.bing.com/th/id/R.3f8cf16a0956d300a10eac8ffde96bc3?rik=xk6gWG0jdU4Zfw&pid=ImgRaw&r=0", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Leader", "image": "https://th.bing.com/th/id/R.c26c851a615f3f7b10961d978d9ec58b?rik=TEWSbv%2f5cYigBw&riu=http%3a%2f%2fvignette3.wikia.nocookie.net%2fmarveldatabase%2fimages%2fe%2fe5%2fSamuel_Sterns_(Earth-616)_from_Incredible_Hulk_Vol_1_603.jpg%2frevision%2flatest%3fcb%3d20151225193000&ehk=sDneWOS7Ft6bKL8P5wNyNyV8H94BYEVN%2fvFGJvKrV%2fg%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Abomination", "image": "https://th.bing.com/th/id/OIP.gO14pIbdjlpMZtPEfbtUmAHaJl?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Mister Sinister", "image": "https://th.bing.com/th/id/OIP.zL--ZJ1Nzc7DqBibUn06pwHaLY?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Misty Knight", "image": "https://th.bing.com/th/id/R.c8bbf4161da4a77f8b0f2cbb113aecc4?rik=lMtE07A%2beI6Rjw&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Mockingbird", "image": "https://th.bing.com/th/id/OIP.6fhIVm4NYZ6rM8zjY9yO9wHaLc?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Morph", "image": "https://th.bing.com/th/id/R.c338c163775a4e9ca0d85c69832f6f19?rik=XPpsrWsklL0hiQ&riu=http%3a%2f%2fimg1.wikia.nocookie.net%2f__cb20101014051225%2fx-men%2fimages%2f7%2f79%2fXmen6.jpg&ehk=UJeTKBxSWUJ9YtQWLDX%2fAxMzDSwnIGv5f5zIs95MdmQ%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Absorbing Man", "image": "https://th.bing.com/th/id/R.ea98030e62bf4e6b81a86f89ce588f42?rik=9uw%2bykaUD39FGQ&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Adam Warlock", "image": "https://th.bing.com/th/id/OIP.D-Ih8istDmpBZwLoOf5GngHaL8?rs=1&pid=ImgDetMain", "rarity": "Epic", "chance": 0.05},
-    {"name": "Spot", "image": "https://th.bing.com/th/id/R.7876d4b7f20dbcd42c85b569e03fa31e?rik=i%2bmebiCWRxOydg&riu=http%3a%2f%2fwww.marvunapp.com%2fAppendix8%2fspot_ohnnsm9.png&ehk=uoUHd7AeXnToya%2bpKXWJbhSIo9MSO8%2fERvXLvlrZsC4%3d&risl=&pid=ImgRaw&r=0", "rarity": "Common", "chance": 0.20},
-    {"name": "Agatha Harkness", "image": "https://insidepulse.com/wp-content/uploads/2023/08/Agatha-Harkness-1.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Mobius", "image": "https://th.bing.com/th/id/OIP.l__rqb4DXpPgXh2gJdT7egAAAA?rs=1&pid=ImgDetMain", "rarity": "Common", "chance": 0.20},
-    {"name": "Mephisto", "image": "https://th.bing.com/th/id/OIP.sDc4nRQCZd259cHJY1CZMwHaLL?rs=1&pid=ImgDetMain", "rarity": "Legendary", "chance": 0.02},
-    {"name": "Aegis", "image": "https://th.bing.com/th/id/OIP.g352ih-ucr09lpCJ8n_VCAHaLk?rs=1&pid=ImgDetMain", "rarity": "Rare", "chance": 0.15},
-    {"name": "Jocasta", "image": "https://i.pinimg.com/originals/2e/c3/86/2ec386a4478a6ca8d543a3f22118a2eb.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Mr.Fantastic", "image": "https://i.pinimg.com/736x/c0/d0/10/c0d01028e5dd09654509fef5aea17beb--mister-fantastic-fantastic-four-marvel.jpg", "rarity": "Epic", "chance": 0.05}, 
-    {"name": "Invisible Women", "image": "https://i.pinimg.com/736x/47/b6/b6/47b6b62ee036cffb8f6c067a9ea7a6a7.jpg", "rarity": "Epic", "chance": 0.05},
-    {"name": "Human Torch", "image": "https://th.bing.com/th/id/R.15cd1ebd7e695d5d238030fe4fc6ac24?rik=qRXcE%2bzb%2fhtdCA&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-    {"name": "The Thing", "image": "https://th.bing.com/th/id/R.52969c15a1cb03d1ce2339e34d7f5328?rik=mN8dCFGaEhBfYQ&riu=http%3a%2f%2f2.bp.blogspot.com%2f-kIk6v30uBLk%2fVFJbNknBbSI%2fAAAAAAAAAMo%2fQDWdhvLGwg0%2fs1600%2fbenGrimm.jpg&ehk=C1beYfR%2fl%2bTHjYvk03NZXdPbImdbByzn%2bNs9zcIpKOY%3d&risl=&pid=ImgRaw&r=0", "rarity": "Epic", "chance": 0.05},
-
-    ]   
-
-user_collection = {}
-user_rolls = {}
-claimed_characters = {}
-expired_characters = {}
+            records, journal_sizes[guild_id] = self.read_journal(guild_id, data.get("journal_seq", 0))
+        except (OSError, ValueError) as e:
+            # Jak przy snapshocie: bez dziennika stan serwera byłby niepełny, a następny
+            # snapshot utrwaliłby tę stratę. Serwer zostaje niezaładowany do ręcznej naprawy.
+            log_event(logging.ERROR, f"❌ Błąd odczytu dziennika, serwer nie zostanie załadowany: {e}", guild=guild_id)
+            raise
+        return data, records
+
+    def read_journal(self, guild_id, after_seq):
+        """Zwraca rekordy z pliku dziennika o numerze większym niż after_seq.
+
+        Urwany ostatni wiersz (awaria w trakcie append) jest obcinany, żeby kolejny
+        append nie dokleił się do niego. Uszkodzony wiersz w środku pliku to błąd.
+        """
+        file_path = get_server_journal_file(guild_id)
+        records = []
+        count = 0
+        if not os.path.exists(file_path):
+            return records, count
+        with open(file_path, "r+b") as f:
+            valid_end = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if f.read(1):
+                        raise ValueError(f"uszkodzony wpis nr {count + 1} w środku dziennika {file_path}")
+                    log_event(logging.WARNING, "⚠️ Urwany ostatni wpis w dzienniku, obcinam go", guild=guild_id, records=count)
+                    f.truncate(valid_end)
+                    os.fsync(f.fileno())
+                    break
+                if not line.endswith(b"\n"):
+                    # Wpis cały, ale bez końca wiersza - domykamy go przed kolejnym append
+                    f.write(b"\n")
+                    os.fsync(f.fileno())
+                valid_end = f.tell()
+                count += 1
+                if record.get("seq", 0) > after_seq:
+                    records.append(record)
+        return records, count
+
+    def append(self, guild_id, records):
+        """Dopisuje rekordy do dziennika i robi fsync."""
+        with open(get_server_journal_file(guild_id), "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(encode_json(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load_limits(self):
+        """Łączy pliki limitów wszystkich procesów - po zmianie podziału shardów serwer mógł zmienić proces."""
+        limits = {}
+        for file_name in sorted(os.listdir(DATA_FOLDER)):
+            if not re.fullmatch(r"roll_limits(_[\w-]+)?\.json", file_name):
+                continue
+            try:
+                with open(os.path.join(DATA_FOLDER, file_name), "r", encoding="utf-8") as f:
+                    limits.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                log_event(logging.WARNING, f"⚠️ Błąd odczytu limitów losowań: {e}", path=file_name)
+        return limits
+
+    def save_limits(self, limits):
+        write_file_atomic(ROLL_LIMITS_FILE, encode_json(limits))
+
+    def save_stats(self, label, stats):
+        write_file_atomic(os.path.join(DATA_FOLDER, f"stats_{label}.json"), encode_json(stats))
+
+    def load_stats(self):
+        """Zwraca {etykieta procesu: statystyki} opublikowane przez wszystkie procesy."""
+        stats = {}
+        for file_name in os.listdir(DATA_FOLDER):
+            match = re.fullmatch(r"stats_([\w-]+)\.json", file_name)
+            if match:
+                with contextlib.suppress(OSError, json.JSONDecodeError):
+                    with open(os.path.join(DATA_FOLDER, file_name), "r", encoding="utf-8") as f:
+                        stats[match.group(1)] = json.load(f)
+        return stats
+
+    def save(self, guild_id, data):
+        """Zapisuje snapshot i czyści dziennik (snapshot zawiera już jego rekordy)."""
+        write_file_atomic(get_server_data_file(guild_id), encode_json(data))
+        open(get_server_journal_file(guild_id), "w").close()
+
+class SqliteStorage:
+    """Baza SQLite (WAL) z tabelami katalogu, posiadania postaci i stanu losowań.
+
+    Postacie są trzymane raz w tabeli catalog, a ownership wskazuje je po ID.
+    Zapytania (posiadanie, ranking) obsługują indeksy w pamięci, więc baza
+    tylko ładuje i zapisuje stan serwera.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS catalog (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            image TEXT NOT NULL,
+            rarity TEXT NOT NULL,
+            chance REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ownership (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            character_id TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ownership_guild_user ON ownership (guild_id, user_id);
+        CREATE INDEX IF NOT EXISTS ownership_guild_character ON ownership (guild_id, character_id);
+        CREATE TABLE IF NOT EXISTS claims (
+            guild_id TEXT NOT NULL,
+            character_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (guild_id, character_id)
+        );
+        CREATE TABLE IF NOT EXISTS roll_state (
+            guild_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            window_start REAL NOT NULL,
+            rolls INTEGER NOT NULL,
+            claims INTEGER NOT NULL,
+            last_roll REAL NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS reservations (
+            guild_id TEXT NOT NULL,
+            character_id TEXT NOT NULL,
+            until REAL NOT NULL,
+            PRIMARY KEY (guild_id, character_id)
+        );
+        CREATE TABLE IF NOT EXISTS guilds (
+            guild_id TEXT PRIMARY KEY,
+            journal_seq INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS process_stats (
+            label TEXT PRIMARY KEY,
+            stats TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        # Połączenia używa wątek zapisów (run_storage), a przy starcie i migracji główny wątek
+        # timeout: przy kilku procesach shardów czekamy na blokadę zapisu zamiast zgłaszać błąd
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.create_function("owns_guild", 1, owns_guild, deterministic=True)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def sync_catalog(self, catalog):
+        """Wpisuje aktualny katalog postaci (potrzebny do nazw i rzadkości w zapytaniach)."""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO catalog (id, name, image, rarity, chance) VALUES (?, ?, ?, ?, ?)",
+                [(c["id"], c["name"], c["image"], c["rarity"], c["chance"]) for c in catalog]
+            )
+
+    def guild_ids(self):
+        rows = self.db.execute("SELECT guild_id FROM guilds UNION SELECT guild_id FROM ownership ORDER BY guild_id")
+        return [guild_id for guild_id, in rows]
+
+    def load(self, guild_id):
+        collections = {}
+        rows = self.db.execute(
+            "SELECT user_id, character_id FROM ownership WHERE guild_id = ? ORDER BY id", (guild_id,)
+        )
+        for user_id, character_id in rows:
+            collections.setdefault(user_id, []).append(character_id)
+
+        claimed = dict(self.db.execute("SELECT character_id, user_id FROM claims WHERE guild_id = ?", (guild_id,)))
+        reserved = dict(self.db.execute(
+            "SELECT character_id, until FROM reservations WHERE guild_id = ? AND until > ?", (guild_id, time.time())
+        ))
+        seq = self.db.execute("SELECT journal_seq FROM guilds WHERE guild_id = ?", (guild_id,)).fetchone()
+
+        return {
+            "version": DATA_VERSION,
+            "user_collection": collections,
+            "claimed_characters": claimed,
+            "reserved": reserved,
+            "journal_seq": seq[0] if seq else 0
+        }, []
+
+    def _take(self, guild_id, user_id, character_id):
+        """Usuwa postać z kolekcji użytkownika; zwraca jej ID albo None, jeśli jej nie miał."""
+        if character_id is None:
+            return None
+        cursor = self.db.execute(
+            "DELETE FROM ownership WHERE id = (SELECT id FROM ownership "
+            "WHERE guild_id = ? AND user_id = ? AND character_id = ? LIMIT 1)",
+            (guild_id, user_id, character_id)
+        )
+        return character_id if cursor.rowcount else None
+
+    @staticmethod
+    def _record_id(record, id_key, name_key):
+        return record.get(id_key) or catalog.by_name.get(normalize_name(record.get(name_key, "")))
+
+    def _give(self, guild_id, user_id, character_id):
+        # claims to odwrotność ownership - przy claimie, give i trade zmieniamy oba naraz
+        self.db.execute(
+            "INSERT INTO ownership (guild_id, user_id, character_id) VALUES (?, ?, ?)",
+            (guild_id, user_id, character_id)
+        )
+        self.db.execute(
+            "INSERT OR REPLACE INTO claims (guild_id, character_id, user_id) VALUES (?, ?, ?)",
+            (guild_id, character_id, user_id)
+        )
+
+    def append(self, guild_id, records):
+        """Nakłada paczkę rekordów w jednej transakcji (te same reguły co apply_record).
+
+        Rekordy o seq nie większym niż zapisany są pomijane - ponowiona paczka
+        (np. po anulowaniu w trakcie zamykania) nie jest nakładana drugi raz.
+        """
+        with self.db:
+            stored = self.db.execute("SELECT journal_seq FROM guilds WHERE guild_id = ?", (guild_id,)).fetchone()
+            records = [record for record in records if record["seq"] > (stored[0] if stored else 0)]
+            if not records:
+                return
+            for record in records:
+                op = record["op"]
+                if op == "claim":
+                    character_id = record["id"] if "id" in record else upgrade_character(record["character"])
+                    # Jak w apply_record: postaci, którą ktoś już ma, nie dajemy drugiej osobie
+                    owned = self.db.execute(
+                        "SELECT 1 FROM ownership WHERE guild_id = ? AND character_id = ?", (guild_id, character_id)
+                    ).fetchone()
+                    if not owned:
+                        self._give(guild_id, record["user"], character_id)
+                    self.db.execute(
+                        "DELETE FROM reservations WHERE guild_id = ? AND character_id = ?", (guild_id, character_id)
+                    )
+                elif op == "reserve":
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO reservations (guild_id, character_id, until) VALUES (?, ?, ?)",
+                        (guild_id, record["id"], record["until"])
+                    )
+                elif op == "give":
+                    character_id = self._take(guild_id, record["from"], self._record_id(record, "id", "name"))
+                    if character_id is not None:
+                        self._give(guild_id, record["to"], character_id)
+                elif op == "remove":
+                    character_id = self._take(guild_id, record["user"], self._record_id(record, "id", "name"))
+                    if character_id is not None:
+                        self.db.execute(
+                            "DELETE FROM claims WHERE guild_id = ? AND character_id = ?", (guild_id, character_id)
+                        )
+                elif op == "give_many":
+                    for character_id in record["ids"]:
+                        if self._take(guild_id, record["from"], character_id) is not None:
+                            self._give(guild_id, record["to"], character_id)
+                elif op == "remove_many":
+                    taken = [(guild_id, character_id) for character_id in record["ids"]
+                             if self._take(guild_id, record["user"], character_id) is not None]
+                    self.db.executemany("DELETE FROM claims WHERE guild_id = ? AND character_id = ?", taken)
+                elif op == "trade":
+                    giver_char = self._take(guild_id, record["giver"], self._record_id(record, "giver_id", "giver_name"))
+                    recipient_char = self._take(
+                        guild_id, record["recipient"], self._record_id(record, "recipient_id", "recipient_name")
+                    )
+                    if giver_char is not None:
+                        self._give(guild_id, record["recipient"], giver_char)
+                    if recipient_char is not None:
+                        self._give(guild_id, record["giver"], recipient_char)
+            self.db.execute(
+                "INSERT OR REPLACE INTO guilds (guild_id, journal_seq) VALUES (?, ?)",
+                (guild_id, records[-1]["seq"])
+            )
+
+    def save(self, guild_id, data):
+        """Przepisuje cały stan serwera (używane przy migracji i kompaktowaniu)."""
+        with self.db:
+            for table in ("ownership", "claims", "reservations"):
+                self.db.execute(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,))
+            self.db.executemany(
+                "INSERT INTO ownership (guild_id, user_id, character_id) VALUES (?, ?, ?)",
+                [(guild_id, user_id, character_id)
+                 for user_id, chars in data["user_collection"].items() for character_id in chars]
+            )
+            self.db.executemany(
+                "INSERT INTO claims (guild_id, character_id, user_id) VALUES (?, ?, ?)",
+                [(guild_id, character_id, user_id) for character_id, user_id in data["claimed_characters"].items()]
+            )
+            self.db.executemany(
+                "INSERT INTO reservations (guild_id, character_id, until) VALUES (?, ?, ?)",
+                [(guild_id, character_id, until) for character_id, until in data.get("reserved", {}).items()]
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO guilds (guild_id, journal_seq) VALUES (?, ?)",
+                (guild_id, data.get("journal_seq", 0))
+            )
+
+    def load_limits(self):
+        rows = self.db.execute("SELECT guild_id, user_id, window_start, rolls, claims, last_roll FROM roll_state")
+        limits = {}
+        for guild_id, user_id, *state in rows:
+            limits.setdefault(guild_id, {})[user_id] = state
+        return limits
+
+    def save_limits(self, limits):
+        """Zastępuje stan limitów losowań serwerów tego procesu snapshotem z RollLimiter."""
+        with self.db:
+            self.db.execute("DELETE FROM roll_state WHERE owns_guild(guild_id)")
+            self.db.executemany(
+                "INSERT INTO roll_state (guild_id, user_id, window_start, rolls, claims, last_roll) VALUES (?, ?, ?, ?, ?, ?)",
+                [(guild_id, user_id, *state) for guild_id, users in limits.items() for user_id, state in users.items()]
+            )
+
+    def save_stats(self, label, stats):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO process_stats (label, stats) VALUES (?, ?)", (label, encode_json(stats)))
+
+    def load_stats(self):
+        return {label: json.loads(stats) for label, stats in self.db.execute("SELECT label, stats FROM process_stats")}
+
+def create_storage():
+    """Wybiera backend danych na podstawie zmiennej STORAGE_BACKEND (json/sqlite)."""
+    if STORAGE_BACKEND == "sqlite":
+        backend = SqliteStorage(SQLITE_PATH)
+        backend.sync_catalog(catalog.characters)
+        return backend
+    return JsonStorage()
+
+last_save_time = None  # time.monotonic() ostatniego udanego zapisu (dziennika albo snapshotu)
+
+def mark_saved():
+    global last_save_time
+    last_save_time = time.monotonic()
+
+# Jeden wątek wykonuje całe I/O backendu po kolei (FIFO): dopisania dziennika,
+# snapshoty i odczyty przy ładowaniu nie wyprzedzają się nawzajem, a pętla bota
+# nie czeka na serializację ani fsync.
+storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+async def run_storage(func, *args):
+    """Wykonuje blokującą operację backendu w wątku zapisów (czas liczony jako faza io)."""
+    with phase("io"):
+        return await asyncio.get_running_loop().run_in_executor(storage_executor, func, *args)
+
+journal_appends = set()  # zadania append w toku (flush_pending czeka na nie przy zamykaniu)
+
+async def flush_journal(guild_id):
+    """Przekazuje zbuforowane rekordy do backendu danych jedną paczką.
+
+    Zapis działa jako osobne zadanie pod shield: anulowanie wołającego (np. pętli
+    flush_journals przy zamykaniu) nie porzuca rekordów zdjętych już z bufora.
+    """
+    records = journal_buffers.pop(guild_id, None)
+    if not records:
+        return
+    task = asyncio.ensure_future(_append_journal(guild_id, records))
+    journal_appends.add(task)
+    task.add_done_callback(journal_appends.discard)
+    await asyncio.shield(task)
+
+async def _append_journal(guild_id, records):
+    try:
+        await run_storage(storage.append, guild_id, records)
+        journal_sizes[guild_id] = journal_sizes.get(guild_id, 0) + len(records)
+        mark_saved()
+    except BaseException as e:
+        # Rekordy wracają do bufora (także przy anulowaniu), spróbujemy przy następnym przebiegu.
+        # Gdyby zapis jednak doszedł do skutku, powtórka jest bezpieczna - backendy pomijają znane seq.
+        journal_buffers[guild_id] = records + journal_buffers.get(guild_id, [])
+        if not isinstance(e, Exception):
+            raise
+        log_event(logging.ERROR, f"❌ Błąd zapisu dziennika: {e}", guild=guild_id, op="append", records=len(records))
+
+def snapshot_guild(guild_id):
+    """Zwraca kopię stanu serwera w postaci zapisywanej przez backend.
+
+    To kopia, a nie widok: wątek zapisów serializuje ją, gdy pętla dalej zmienia kolekcje.
+    """
+    return {
+        "version": DATA_VERSION,
+        "user_collection": {user_id: list(chars) for user_id, chars in collections_of(guild_id).items()},
+        "claimed_characters": dict(ownership[guild_id].owners) if guild_id in ownership else {},
+        "reserved": expiry_engine.pending(guild_id),
+        "journal_seq": journal_seq.get(guild_id, 0)
+    }
+
+class SnapshotWriter:
+    """Łączy równoległe zapisy snapshotu tego samego serwera.
+
+    Na serwer działa najwyżej jedno zadanie zapisu. Prośba, która przyjdzie
+    w trakcie, tylko oznacza serwer jako zmieniony - zadanie robi wtedy jeszcze
+    jedną rundę z najnowszym stanem, a wszyscy czekający dostają jej wynik.
+    """
+
+    def __init__(self):
+        self.tasks = {}    # guild_id -> asyncio.Task zapisu
+        self.dirty = set() # serwery zmienione od początku bieżącej rundy
+
+    async def save(self, guild_id):
+        task = self.tasks.get(guild_id)
+        if task is None or task.done():
+            task = self.tasks[guild_id] = asyncio.create_task(self.run(guild_id))
+        else:
+            self.dirty.add(guild_id)
+        # shield: anulowana komenda nie przerywa zapisu, na który czekają inni
+        return await asyncio.shield(task)
+
+    async def run(self, guild_id):
+        saved = False
+        while True:
+            self.dirty.discard(guild_id)
+            saved = await write_snapshot(guild_id)
+            if guild_id not in self.dirty:
+                return saved
+
+snapshot_writer = SnapshotWriter()
+
+async def write_snapshot(guild_id):
+    """Jedna runda zapisu: kopia stanu na pętli, serializacja i zapis w wątku zapisów."""
+    with timed_operation("save_data"):
+        async with locks.guild(guild_id):
+            if guild_id not in loaded_guilds:
+                # Stanu serwera nie ma w pamięci - zapis pustego snapshotu nadpisałby dane
+                return False
+            if guild_id in ownership_conflicts:
+                log_event(
+                    logging.WARNING, "⚠️ Snapshot wstrzymany: duplikaty posiadania czekają na check-ownership --repair",
+                    guild=guild_id, duplicates=len(ownership_conflicts[guild_id])
+                )
+                return False
+            start = time.perf_counter()
+            data_to_save = snapshot_guild(guild_id)
+            saved_seq = data_to_save["journal_seq"]
+
+            try:
+                await run_storage(storage.save, guild_id, data_to_save)
+            except Exception as e:
+                log_event(logging.ERROR, f"❌ Błąd zapisu danych: {e}", guild=guild_id, op="save")
+                return False
+
+            # Snapshot zawiera rekordy do saved_seq; nowsze (dodane w trakcie zapisu) zostają w buforze
+            pending = [r for r in journal_buffers.get(guild_id, []) if r["seq"] > saved_seq]
+            if pending:
+                journal_buffers[guild_id] = pending
+            else:
+                journal_buffers.pop(guild_id, None)
+            journal_sizes[guild_id] = 0
+            mark_saved()
+            log_event(
+                logging.INFO, "✅ Dane zapisane", guild=guild_id, op="save",
+                users=len(data_to_save["user_collection"]), claimed=len(data_to_save["claimed_characters"]),
+                ms=round((time.perf_counter() - start) * 1000)
+            )
+            return True
+
+async def save_data(guild_id):
+    """Zapisuje snapshot danych serwera i skraca jego dziennik; zwraca True po udanym zapisie."""
+    return await snapshot_writer.save(guild_id)
+
+def _load_guild(guild_id, backend=None):
+    """Ładuje stan serwera synchronicznie (migracja i narzędzia poza pętlą bota)."""
+    data, records = (backend or storage).load(guild_id)
+    _apply_snapshot(guild_id, data, records)
+
+def _apply_snapshot(guild_id, data, records):
+    """Buduje stan serwera w pamięci ze snapshotu i rekordów dziennika."""
+    upgrade_snapshot(data)
+    # Kolekcje są źródłem prawdy; claimed_characters w snapshocie to tylko ich odwrotność
+    ownership[guild_id], duplicates = Ownership.from_collections(data.get("user_collection", {}))
+    if duplicates:
+        ownership_conflicts[guild_id] = duplicates
+        log_event(
+            logging.WARNING, "⚠️ Postacie w kilku kolekcjach - w pamięci są u pierwszego właściciela, "
+            "snapshot wstrzymany do naprawy (python bot.py check-ownership --repair)",
+            guild=guild_id, duplicates=len(duplicates)
+        )
+    else:
+        ownership_conflicts.pop(guild_id, None)
+    build_collection_indexes(guild_id)
+    evicted_summaries.pop(guild_id, None)  # od teraz liczy go ranking w pamięci
+    expiry_engine.deadlines.pop(guild_id, None)
+    for character_id, until in data.get("reserved", {}).items():
+        apply_record(guild_id, {"op": "reserve", "id": character_id, "until": until})
+
+    # Odtwarzamy dziennik z dysku, a potem rekordy jeszcze niezapisane
+    last_seq = data.get("journal_seq", 0)
+    for record in records + journal_buffers.get(guild_id, []):
+        if record["seq"] > last_seq:
+            apply_record(guild_id, record)
+            last_seq = record["seq"]
+    journal_seq[guild_id] = max(last_seq, journal_seq.get(guild_id, 0))
+    build_sampler(guild_id)
+
+async def load_data(guild_id):
+    """Wczytuje stan serwera w wątku zapisów i buduje go w pamięci (wołający trzyma blokadę serwera).
+
+    Odczyt stoi w kolejce za wcześniejszymi zapisami, więc widzi wszystko, co już wysłaliśmy na dysk.
+    """
+    with timed_operation("load_data"):
+        start = time.perf_counter()
+        data, records = await run_storage(storage.load, guild_id)
+        _apply_snapshot(guild_id, data, records)
+        log_event(
+            logging.INFO, "✅ Dane załadowane", guild=guild_id, op="load",
+            users=len(collections_of(guild_id)), claimed=len(ownership[guild_id].owners),
+            replayed=len(records), ms=round((time.perf_counter() - start) * 1000)
+        )
+
+def migrate_json_to_sqlite(db_path=None):
+    """Jednorazowo przenosi wszystkie pliki data/server_*.json (z dziennikami) do SQLite."""
+    source = JsonStorage()
+    target = SqliteStorage(db_path or SQLITE_PATH)
+    target.sync_catalog(catalog.characters)
+    for guild_id in source.guild_ids():
+        _load_guild(guild_id, source)
+        target.save(guild_id, snapshot_guild(guild_id))
+        log_event(logging.INFO, "✅ Zmigrowano serwer", guild=guild_id, users=len(collections_of(guild_id)))
+
+def ownership_problems(data):
+    """Sprawdza spójność posiadania w snapshocie (po upgrade_snapshot); zwraca opisy problemów."""
+    problems = []
+    owners = {}
+    for user_id, chars in data.get("user_collection", {}).items():
+        for character_id in chars:
+            if character_id in owners:
+                problems.append(f"{character_id}: w kolekcjach {owners[character_id]} i {user_id}")
+                continue
+            owners[character_id] = user_id
+            if character_id not in catalog.by_id:
+                problems.append(f"{character_id}: brak w katalogu (zostaje w kolekcji {user_id})")
+    claimed = data.get("claimed_characters", {})
+    for character_id, user_id in owners.items():
+        if claimed.get(character_id) != user_id:
+            problems.append(f"{character_id}: claimed_characters wskazuje {claimed.get(character_id)}, a ma ją {user_id}")
+    for character_id in claimed.keys() - owners.keys():
+        problems.append(f"{character_id}: w claimed_characters ({claimed[character_id]}), ale w żadnej kolekcji")
+    return problems
+
+def check_ownership(repair=False):
+    """Sprawdza posiadanie postaci we wszystkich zapisanych serwerach; zwraca liczbę serwerów z problemami.
+
+    Z repair=True zapisuje poprawiony snapshot: duplikat zostaje u pierwszego właściciela,
+    a claimed_characters jest odtwarzane z kolekcji. Uruchamiać przy zatrzymanym bocie.
+    """
+    broken = 0
+    for guild_id in storage.guild_ids():
+        try:
+            data, records = storage.load(guild_id)
+        except ValueError as e:
+            log_event(logging.ERROR, f"❌ Nie można wczytać serwera: {e}", guild=guild_id)
+            broken += 1
+            continue
+        upgrade_snapshot(data)
+        problems = ownership_problems(data)
+        if not problems:
+            continue
+        broken += 1
+        for problem in problems:
+            log_event(logging.WARNING, f"⚠️ {problem}", guild=guild_id)
+        if repair:
+            _apply_snapshot(guild_id, data, records)
+            storage.save(guild_id, snapshot_guild(guild_id))
+            ownership_conflicts.pop(guild_id, None)
+            log_event(logging.INFO, "✅ Naprawiono posiadanie postaci", guild=guild_id, problems=len(problems))
+    return broken
+
+# Pamięć serwerów: bezczynne dłużej niż GUILD_IDLE_SECONDS wypadają, a przy przekroczonym
+# budżecie wypadają najdawniej używane. Nigdy nie wyrzucamy serwera używanego krócej niż
+# GUILD_MIN_IDLE_SECONDS temu - to dłużej niż trwa każda komenda, widok czy spawn.
+GUILD_IDLE_SECONDS = int(os.getenv("GUILD_IDLE_SECONDS", "3600"))
+GUILD_MIN_IDLE_SECONDS = 900
+if GUILD_IDLE_SECONDS < GUILD_MIN_IDLE_SECONDS:
+    log_event(
+        logging.WARNING, "⚠️ GUILD_IDLE_SECONDS poniżej minimum bezczynności - używam minimum",
+        requested=GUILD_IDLE_SECONDS, used=GUILD_MIN_IDLE_SECONDS
+    )
+    GUILD_IDLE_SECONDS = GUILD_MIN_IDLE_SECONDS
+GUILD_CACHE_BUDGET_MB = float(os.getenv("GUILD_CACHE_BUDGET_MB", "256"))
+GUILD_BASE_BYTES = 48 * 1024   # szacunek na serwer: sampler, indeksy, ranking
+CHARACTER_BYTES = 512          # szacunek na posiadaną postać: kolekcja, indeksy nazw i rzadkości
+
+class GuildCache:
+    """Serwery załadowane do pamięci w kolejności ostatniego użycia (LRU)."""
+
+    def __init__(self):
+        self.last_used = OrderedDict()  # guild_id -> time.monotonic() ostatniego użycia
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.estimated_bytes = 0
+
+    def __contains__(self, guild_id):
+        return guild_id in self.last_used
+
+    def __iter__(self):
+        return iter(list(self.last_used))
+
+    def __len__(self):
+        return len(self.last_used)
+
+    def add(self, guild_id):
+        self.last_used[guild_id] = time.monotonic()
+        self.last_used.move_to_end(guild_id)
+
+    def touch(self, guild_id):
+        self.hits += 1
+        self.last_used[guild_id] = time.monotonic()
+        self.last_used.move_to_end(guild_id)
+
+    def discard(self, guild_id):
+        self.last_used.pop(guild_id, None)
+
+    def guild_bytes(self, guild_id):
+        collections = collections_of(guild_id)
+        return GUILD_BASE_BYTES + CHARACTER_BYTES * sum(map(len, collections.values()))
+
+    def eviction_candidates(self, now):
+        """Serwery do wyrzucenia, od najdawniej używanego: po TTL albo ponad budżet."""
+        sizes = {guild_id: self.guild_bytes(guild_id) for guild_id in self.last_used}
+        self.estimated_bytes = sum(sizes.values())
+        over_budget = self.estimated_bytes - GUILD_CACHE_BUDGET_MB * 1024 * 1024
+        candidates = []
+        for guild_id, last_used in self.last_used.items():
+            idle = now - last_used
+            if idle < GUILD_MIN_IDLE_SECONDS:
+                break  # dalej są tylko serwery używane później
+            if idle >= GUILD_IDLE_SECONDS or over_budget > 0:
+                candidates.append(guild_id)
+                over_budget -= sizes[guild_id]
+        return candidates
+
+loaded_guilds = GuildCache()  # serwery, których stan w pamięci jest aktualny
+
+async def ensure_guild_loaded(guild_id):
+    """Ładuje stan serwera z dysku przy pierwszym użyciu (także po wyrzuceniu z pamięci)."""
+    if guild_id in loaded_guilds:
+        loaded_guilds.touch(guild_id)
+        return
+    async with locks.guild(guild_id):
+        # Inna komenda mogła załadować serwer, gdy czekaliśmy na blokadę
+        if guild_id not in loaded_guilds:
+            loaded_guilds.misses += 1
+            await load_data(guild_id)
+            loaded_guilds.add(guild_id)
+
+async def evict_guild(guild_id):
+    """Zapisuje snapshot serwera i zwalnia jego stan w pamięci; zwraca True, jeśli wyrzucono.
+
+    Serwer z wiszącymi spawnami, niezapisanymi rekordami albo użyty w międzyczasie zostaje.
+    journal_seq zostaje, żeby numeracja rekordów dziennika nie zaczęła się od nowa.
+    """
+    if expiry_engine.deadlines.get(guild_id) or guild_id in ownership_conflicts:
+        return False  # wiszące spawny albo duplikaty posiadania (snapshot wstrzymany do naprawy)
+    if not await save_data(guild_id):
+        return False
+    async with locks.guild(guild_id):
+        last_used = loaded_guilds.last_used.get(guild_id)
+        if last_used is None or time.monotonic() - last_used < GUILD_MIN_IDLE_SECONDS or journal_buffers.get(guild_id):
+            return False
+        evicted_summaries[guild_id] = leaderboard_summary(leaderboards.get(guild_id, Leaderboard()))
+        for state in (ownership, name_index, prefix_index, leaderboards,
+                      rarity_index, collection_versions, guild_samplers, journal_sizes, expiry_engine.deadlines):
+            state.pop(guild_id, None)
+        collection_pages.discard_where(lambda key: key[0] == guild_id)
+        loaded_guilds.discard(guild_id)
+        loaded_guilds.evictions += 1
+    return True
+
+async def reload_guild(guild_id):
+    """Wymusza ponowne wczytanie stanu serwera z dysku."""
+    await flush_journal(guild_id)
+    loaded_guilds.discard(guild_id)
+    await ensure_guild_loaded(guild_id)
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.strip().lower()).strip("-")
+
+# Katalog postaci leży w pliku danych; kolekcje trzymają tylko ID, a postać odczytujemy
+# z katalogu przy wyświetlaniu
+CATALOG_FILE = "characters.json"
+CATALOG_FIELDS = ("id", "name", "image", "rarity", "chance")
+WEIGHT_SCALE = 10000
+
+class Catalog:
+    """Skompilowany katalog: równoległe tablice (ID, nazwy, wagi) i słowniki wyszukiwania.
+
+    Cały katalog podmieniamy jednym przypisaniem do `catalog`, więc kod między
+    punktami await zawsze widzi spójne tablice, indeksy i wagi.
+    """
+
+    __slots__ = ("characters", "ids", "names", "weights", "index", "by_id", "by_image", "by_name")
+
+    def __init__(self, entries):
+        self.characters = entries
+        self.ids = [c["id"] for c in entries]
+        self.names = [c["name"] for c in entries]
+        self.weights = [int(round(c["chance"] * WEIGHT_SCALE)) for c in entries]
+        self.index = {character_id: i for i, character_id in enumerate(self.ids)}
+        self.by_id = dict(zip(self.ids, entries))
+        self.by_image = {(c["name"], c["image"]): c["id"] for c in entries}
+        self.by_name = {}
+        for character_id, name in zip(self.ids, self.names):
+            self.by_name.setdefault(normalize_name(name), character_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+def validate_catalog(entries):
+    """Sprawdza wpisy katalogu; rzuca ValueError z listą problemów, zwraca listę ostrzeżeń."""
+    if not isinstance(entries, list):
+        raise ValueError("Invalid character catalog: expected a list of characters.")
+    problems = []
+    warnings = []
+    ids = set()
+    pairs = set()
+    names = {}
+    for position, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            problems.append(f"#{position}: entry is not an object")
+            continue
+        label = f"#{position} ({entry.get('id') or entry.get('name')})"
+        missing = [field for field in CATALOG_FIELDS if field not in entry]
+        if missing:
+            problems.append(f"{label}: missing {', '.join(missing)}")
+            continue
+        character_id, name, chance = entry["id"], entry["name"], entry["chance"]
+        if not isinstance(character_id, str) or not character_id or slugify(character_id) != character_id:
+            problems.append(f"{label}: id must be a lowercase slug")
+        elif character_id in ids:
+            problems.append(f"{label}: duplicate id")
+        ids.add(character_id)
+        if not isinstance(name, str) or not name.strip():
+            problems.append(f"{label}: empty name")
+            continue
+        if (name, entry["image"]) in pairs:
+            problems.append(f"{label}: duplicate name and image")
+        pairs.add((name, entry["image"]))
+        if entry["rarity"] not in RARITIES:
+            problems.append(f"{label}: unknown rarity {entry['rarity']!r}")
+        if isinstance(chance, bool) or not isinstance(chance, (int, float)) or not 0 < chance <= 1:
+            problems.append(f"{label}: chance must be in (0, 1]")
+        elif int(round(chance * WEIGHT_SCALE)) == 0:
+            problems.append(f"{label}: chance is below 1/{WEIGHT_SCALE}")
+        names.setdefault(normalize_name(name), []).append(character_id)
+    if not entries:
+        problems.append("catalog is empty")
+    if problems:
+        raise ValueError("Invalid character catalog:\n" + "\n".join(problems))
+    # Warianty o tej samej nazwie są dozwolone (rozróżnia je ID), ale warto je widzieć
+    for variants in names.values():
+        if len(variants) > 1:
+            warnings.append(f"{', '.join(variants)} share a name")
+    return warnings
+
+def load_catalog(path=CATALOG_FILE):
+    """Wczytuje, sprawdza i kompiluje katalog postaci z pliku."""
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    warnings = validate_catalog(entries)
+    for warning in warnings:
+        log_event(logging.INFO, f"ℹ️ Katalog: {warning}")
+    log_event(logging.INFO, "📚 Wczytano katalog", path=path, characters=len(entries))
+    return Catalog(entries)
+
+catalog = load_catalog()
+
+def get_character(character_id):
+    """Zwraca wpis katalogu dla ID (lub zastępczy wpis, jeśli postaci już nie ma w katalogu)."""
+    character = catalog.by_id.get(character_id)
+    if character is None:
+        character = {"id": character_id, "name": character_id, "image": None, "rarity": "Unknown", "chance": 0}
+    return character
+
+def upgrade_character(entry):
+    """Zamienia starą, pełną kopię postaci na ID z katalogu."""
+    if isinstance(entry, str):
+        return entry
+    character_id = catalog.by_image.get((entry.get("name"), entry.get("image")))
+    if character_id is None:
+        character_id = catalog.by_name.get(normalize_name(entry.get("name", "")))
+    if character_id is None:
+        character_id = slugify(entry.get("name", "unknown"))
+        log_event(logging.WARNING, f"⚠️ Postaci {entry.get('name')} nie ma w katalogu", id=character_id)
+    return character_id
+
+def upgrade_snapshot(data):
+    """Podnosi snapshot w starym formacie (pełne kopie postaci, claimy po nazwie) do ID."""
+    if data.get("version", 1) >= DATA_VERSION:
+        return
+    collections = {
+        user_id: [upgrade_character(c) for c in chars]
+        for user_id, chars in data.get("user_collection", {}).items()
+    }
+    claimed = {}
+    for name, user_id in data.get("claimed_characters", {}).items():
+        # Przy zdublowanych nazwach wybieramy wariant, który właściciel faktycznie ma
+        owned = [i for i in collections.get(user_id, []) if get_character(i)["name"] == name]
+        claimed[owned[0] if owned else upgrade_character({"name": name})] = user_id
+    data["user_collection"] = collections
+    data["claimed_characters"] = claimed
+    data["version"] = DATA_VERSION
+
+# Embedy postaci: kolory rzadkości i style rodzajów są stałe na poziomie modułu, a sam
+# embed budujemy przy każdym użyciu - to szybsze niż kopiowanie gotowego szablonu.
+RARITY_COLORS = {
+    "Common": discord.Color.light_gray(),
+    "Rare": discord.Color.blue(),
+    "Epic": discord.Color.purple(),
+    "Legendary": discord.Color.gold()
+}
+
+EMBED_STYLES = {
+    # rodzaj: (wzór tytułu, stały kolor albo None = kolor rzadkości, miejsce obrazka)
+    "roll": ("You found {name}!", None, "image"),
+    "spawn": ("🔥 A wild {name} appears!", discord.Color.blue(), "image"),
+    "remove": ("Remove {name}?", discord.Color.red(), "thumbnail"),
+}
+
+def character_embed(kind, character, **fields):
+    """Buduje embed postaci danego rodzaju; fields (np. description) trafiają do konstruktora."""
+    title, color, image_slot = EMBED_STYLES[kind]
+    if color is None:
+        color = RARITY_COLORS.get(character["rarity"], discord.Color.default())
+    embed = discord.Embed(title=title.format(name=character["name"]), color=color, **fields)
+    if character["image"]:
+        if image_slot == "image":
+            embed.set_image(url=character["image"])
+        else:
+            embed.set_thumbnail(url=character["image"])
+    embed.set_footer(text=f"Rarity: {character['rarity']}")
+    return embed
+
+class WeightedSampler:
+    """Drzewo Fenwicka z wagami postaci: losowanie i zmiana wagi w O(log n).
+
+    Wagi są liczbami całkowitymi (chance * WEIGHT_SCALE), żeby sumy w drzewie
+    nie gubiły precyzji przy wielu aktualizacjach.
+    """
+
+    __slots__ = ("size", "tree", "weights", "total", "top_bit")
+
+    def __init__(self, weights):
+        self.weights = list(weights)
+        self.size = len(self.weights)
+        self.tree = [0] * (self.size + 1)
+        self.total = 0
+        for i, weight in enumerate(self.weights, 1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+            self.total += weight
+        self.top_bit = 1 << max(self.size.bit_length() - 1, 0)
+
+    def set_weight(self, index, weight):
+        delta = weight - self.weights[index]
+        if not delta:
+            return
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self):
+        """Zwraca indeks wylosowany proporcjonalnie do wag albo None, gdy wszystkie są zerowe."""
+        if self.total <= 0:
+            return None
+        target = random.randrange(self.total)
+        position = 0
+        bit = self.top_bit
+        while bit:
+            nxt = position + bit
+            if nxt <= self.size and self.tree[nxt] <= target:
+                position = nxt
+                target -= self.tree[nxt]
+            bit >>= 1
+        return position
+
+guild_samplers = {}  # guild_id -> WeightedSampler z wyzerowanymi zajętymi postaciami
+
+def build_sampler(guild_id):
+    """Buduje od zera sampler serwera (przy ładowaniu danych)."""
+    claimed = ownership[guild_id].owners if guild_id in ownership else {}
+    reserved = expiry_engine.deadlines.get(guild_id, {})
+    sampler = WeightedSampler(
+        0 if character_id in claimed or character_id in reserved else weight
+        for character_id, weight in zip(catalog.ids, catalog.weights)
+    )
+    guild_samplers[guild_id] = sampler
+    return sampler
+
+def set_character_available(guild_id, character_id, available):
+    """Włącza/wyłącza postać w puli losowania serwera bez przebudowy samplera."""
+    sampler = guild_samplers.get(guild_id)
+    index = catalog.index.get(character_id)
+    if sampler is not None and index is not None:
+        sampler.set_weight(index, catalog.weights[index] if available else 0)
+
+async def hot_reload_catalog():
+    """Wczytuje katalog z pliku i podmienia go razem z zależnymi samplerami i indeksami.
+
+    Podmiana w pamięci nie ma żadnego await, więc żadna komenda nie zobaczy stanu
+    pośredniego; trwające losowania trzymają już swoją postać i zapisują ją po ID.
+    Tabelę catalog w SQLite uzupełniamy dopiero potem, w wątku zapisów - to samo
+    połączenie nie może zatwierdzić transakcji append() w połowie. Przy błędzie
+    walidacji rzuca ValueError, a stary katalog zostaje w użyciu.
+    """
+    global catalog
+    new_catalog = load_catalog()
+    catalog = new_catalog
+    for guild_id in loaded_guilds:
+        build_collection_indexes(guild_id)
+        build_sampler(guild_id)
+    if isinstance(storage, SqliteStorage):
+        await run_storage(storage.sync_catalog, new_catalog.characters)
+    return new_catalog
+
+class ExpiryEngine:
+    """Terminy rezerwacji postaci w kopcu (termin, guild_id, character_id).
+
+    Jedno zadanie śpi do najbliższego terminu i wywołuje on_expire dokładnie
+    wtedy, bez okresowego przeglądania wszystkich wpisów. deadlines trzyma
+    aktualne rezerwacje per serwer; anulowane wpisy zostają w kopcu i są
+    pomijane przy zdjęciu.
+    """
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self.heap = []
+        self.deadlines = {}  # guild_id -> {character_id: termin (time.time())}
+        self.changed = None
+        self.task = None
+
+    def schedule(self, guild_id, character_id, deadline):
+        self.deadlines.setdefault(guild_id, {})[character_id] = deadline
+        heapq.heappush(self.heap, (deadline, guild_id, character_id))
+        if self.changed is not None and self.heap[0][0] == deadline:
+            self.changed.set()
+
+    def cancel(self, guild_id, character_id):
+        return self.deadlines.get(guild_id, {}).pop(character_id, None) is not None
+
+    def pending(self, guild_id):
+        return dict(self.deadlines.get(guild_id, {}))
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.changed = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                deadline, guild_id, character_id = heapq.heappop(self.heap)
+                if self.deadlines.get(guild_id, {}).get(character_id) != deadline:
+                    continue  # anulowana albo przesunięta rezerwacja
+                del self.deadlines[guild_id][character_id]
+                try:
+                    self.on_expire(guild_id, character_id)
+                except Exception as e:
+                    log_event(logging.ERROR, f"❌ Błąd wygaszania: {e}", guild=guild_id, id=character_id)
+
+            self.changed.clear()
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+def release_character(guild_id, character_id):
+    """Rezerwacja wygasła - niezebrana postać wraca do puli losowania serwera."""
+    if owner_of(guild_id, character_id) is None:
+        set_character_available(guild_id, character_id, True)
+        log_event(logging.DEBUG, "Rezerwacja wygasła", guild=guild_id, id=character_id)
+
+expiry_engine = ExpiryEngine(release_character)
+
+ROLL_LIMIT = 10                 # losowań na okno
+ROLL_WINDOW_SECONDS = 3600      # długość okna limitu
+ROLL_COOLDOWN_SECONDS = 8       # minimalny odstęp między losowaniami
+CLAIMS_PER_WINDOW = 1           # ile postaci z losowań można zebrać w oknie
+
+class RollRecord:
+    __slots__ = ("window_start", "rolls", "claims", "last_roll")
+
+    def __init__(self, window_start, rolls, claims, last_roll):
+        self.window_start = window_start
+        self.rolls = rolls
+        self.claims = claims
+        self.last_roll = last_roll
+
+class RollLimiter:
+    """Limity /roll: okno ROLL_LIMIT losowań i CLAIMS_PER_WINDOW zebrań oraz cooldown.
+
+    Rekordy leżą w OrderedDict per serwer w kolejności ostatniego losowania,
+    więc bezczynne wpisy usuwamy od początku bez przeglądania reszty.
+    Sprawdzenia są O(1) i nie alokują obiektów.
+    """
+
+    def __init__(self):
+        self.records = {}  # guild_id -> OrderedDict(user_id -> RollRecord)
+        self.dirty = False
+
+    def _record(self, guild_id, user_id, now):
+        users = self.records.get(guild_id)
+        record = users.get(user_id) if users is not None else None
+        if record is not None and now - record.window_start >= ROLL_WINDOW_SECONDS:
+            # Okno minęło - zaczynamy nowe w miejscu
+            record.window_start = now
+            record.rolls = 0
+            record.claims = 0
+        return record
+
+    def retry_after(self, guild_id, user_id, now):
+        """Ile sekund użytkownik musi czekać na losowanie (0.0 = może losować)."""
+        record = self._record(guild_id, user_id, now)
+        if record is None:
+            return 0.0
+        if record.rolls >= ROLL_LIMIT:
+            return record.window_start + ROLL_WINDOW_SECONDS - now
+        return max(0.0, record.last_roll + ROLL_COOLDOWN_SECONDS - now)
+
+    def limit_reached(self, guild_id, user_id, now):
+        record = self._record(guild_id, user_id, now)
+        return record is not None and record.rolls >= ROLL_LIMIT
+
+    def record_roll(self, guild_id, user_id, now):
+        users = self.records.get(guild_id)
+        if users is None:
+            users = self.records[guild_id] = OrderedDict()
+        record = self._record(guild_id, user_id, now)
+        if record is None:
+            record = users[user_id] = RollRecord(now, 0, 0, now)
+        record.rolls += 1
+        record.last_roll = now
+        users.move_to_end(user_id)
+        self.dirty = True
+
+    def can_claim(self, guild_id, user_id, now):
+        record = self._record(guild_id, user_id, now)
+        return record is None or record.claims < CLAIMS_PER_WINDOW
+
+    def record_claim(self, guild_id, user_id, now):
+        record = self._record(guild_id, user_id, now)
+        if record is not None:
+            record.claims += 1
+            self.dirty = True
+
+    def evict_idle(self, now):
+        """Usuwa użytkowników, których okno i cooldown już minęły (stan jak dla nowego)."""
+        evicted = 0
+        for guild_id in list(self.records):
+            users = self.records[guild_id]
+            while users:
+                user_id, record = next(iter(users.items()))
+                if now - record.last_roll < ROLL_WINDOW_SECONDS:
+                    break
+                del users[user_id]
+                evicted += 1
+            if not users:
+                del self.records[guild_id]
+        if evicted:
+            self.dirty = True
+        return evicted
+
+    def snapshot(self):
+        return {
+            guild_id: {
+                user_id: [r.window_start, r.rolls, r.claims, r.last_roll] for user_id, r in users.items()
+            }
+            for guild_id, users in self.records.items()
+        }
+
+    def restore(self, limits, now):
+        for guild_id, users in limits.items():
+            ordered = sorted(users.items(), key=lambda item: item[1][3])
+            for user_id, (window_start, rolls, claims, last_roll) in ordered:
+                if now - last_roll < ROLL_WINDOW_SECONDS:
+                    self.records.setdefault(guild_id, OrderedDict())[user_id] = RollRecord(
+                        window_start, rolls, claims, last_roll
+                    )
+
 spawn_channels = {}
-user_claims = {}
+
+storage = create_storage()
+roll_limiter = RollLimiter()
+roll_limiter.restore({g: users for g, users in storage.load_limits().items() if owns_guild(g)}, time.time())
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+# AutoShardedBot: bez SHARD_COUNT Discord sam podaje liczbę shardów, z SHARD_IDS
+# proces łączy tylko swoje shardy (patrz `python bot.py shards`)
+class MarvelBot(commands.AutoShardedBot):
+    async def close(self):
+        # Najpierw gateway (koniec nowych mutacji), potem bufory - wątek zapisów jeszcze działa.
+        # Pętle zapisu zatrzymujemy sami; ich rozpoczęte zapisy dokończy flush_pending.
+        await super().close()
+        flush_journals.cancel()
+        maintain_roll_limits.cancel()
+        await flush_pending()
+
+    async def setup_hook(self):
+        # Przed logowaniem do gatewaya: najpierw pętle zapisu, potem serwer HTTP
+        # (błąd portu nie może zostawić mutacji tylko w pamięci)
+        start_background_loops()
+        try:
+            await start_http_server()
+        except OSError as e:
+            log_event(logging.ERROR, f"❌ Serwer zdrowia i metryk nie wystartował: {e}", port=HTTP_PORT)
+
+bot = MarvelBot(command_prefix="/", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
 
 def get_random_character(guild_id):
-    unclaimed = [char for char in characters if char["name"] not in claimed_characters.get(guild_id, {})]
-    if not unclaimed:
+    """Losuje niezajętą postać z wagą `chance` w O(log n)."""
+    sampler = guild_samplers.get(guild_id)
+    if sampler is None:
+        sampler = build_sampler(guild_id)
+    index = sampler.sample()
+    if index is None:
         return None
-    weights = [char["chance"] for char in unclaimed]
-    return random.choices(unclaimed, weights=weights)[0]
+    return catalog.characters[index]
+
+@tasks.loop(seconds=JOURNAL_FLUSH_SECONDS)
+async def flush_journals():
+    """Zapisuje na dysk zbuforowane dzienniki wszystkich serwerów."""
+    for guild_id in list(journal_buffers):
+        await flush_journal(guild_id)
+
+async def save_roll_limits():
+    """Zapisuje stan limitera, jeśli zmienił się od ostatniego zapisu."""
+    if roll_limiter.dirty:
+        roll_limiter.dirty = False
+        try:
+            await run_storage(storage.save_limits, roll_limiter.snapshot())
+        except BaseException as e:
+            roll_limiter.dirty = True  # także przy anulowaniu - flush_pending zapisze jeszcze raz
+            if not isinstance(e, Exception):
+                raise
+            log_event(logging.ERROR, f"❌ Błąd zapisu limitów losowań: {e}")
+
+@tasks.loop(minutes=1)
+async def maintain_roll_limits():
+    """Usuwa bezczynne wpisy limitera i zapisuje jego stan, jeśli się zmienił."""
+    roll_limiter.evict_idle(time.time())
+    await save_roll_limits()
+
+async def flush_pending():
+    """Zapisuje wszystko, co czeka w pamięci: dzienniki serwerów i limity losowań (przy zamykaniu).
+
+    Najpierw czeka na zapisy rozpoczęte przez pętlę - nieudane wracają do bufora.
+    """
+    if journal_appends:
+        await asyncio.gather(*journal_appends, return_exceptions=True)
+    for guild_id in list(journal_buffers):
+        await flush_journal(guild_id)
+    await save_roll_limits()
+    if journal_buffers:
+        log_event(logging.ERROR, "❌ Nie zapisano dzienników przed zamknięciem", guilds=len(journal_buffers))
+
+STATS_STALE_SECONDS = 300  # statystyki procesu starsze niż to pomijamy (proces nie żyje)
+
+def local_stats():
+    """Podsumowanie serwerów tego procesu - tylko liczby, publikowane dla pozostałych procesów.
+
+    Serwery wyrzucone z pamięci liczymy z podsumowań zapisanych przy wyrzuceniu.
+    """
+    summaries = [leaderboard_summary(board) for board in leaderboards.values()] + list(evicted_summaries.values())
+    collectors = 0
+    totals = [0] * (len(RARITIES) + 1)
+    for guild_collectors, guild_totals in summaries:
+        collectors += guild_collectors
+        for i, count in enumerate(guild_totals):
+            totals[i] += count
+    owned, rarity_counts = totals[0], totals[1:]
+    return {
+        "updated": time.time(),
+        "shards": SHARD_IDS or "all",
+        "guilds": len(bot.guilds),
+        "guilds_loaded": len(loaded_guilds),
+        "collectors": collectors,
+        "characters": owned,
+        "rarity": dict(zip(RARITIES, rarity_counts)),
+    }
 
-@tasks.loop(hours=1)
-async def cleanup_expired_characters():
-    """Usuwa postacie, które nie zostały zebrane w określonym czasie."""
-    current_time = time.time()
-    expired_to_remove = []
+async def global_stats():
+    """Sumuje świeże statystyki wszystkich procesów; własne liczymy na bieżąco."""
+    published = await run_storage(storage.load_stats)
+    published[PROCESS_LABEL] = local_stats()
+    now = time.time()
+    alive = [stats for stats in published.values() if now - stats["updated"] < STATS_STALE_SECONDS]
+    totals = {key: sum(stats[key] for stats in alive) for key in ("guilds", "collectors", "characters")}
+    totals["rarity"] = {r: sum(stats["rarity"].get(r, 0) for stats in alive) for r in RARITIES}
+    totals["processes"] = len(alive)
+    return totals
+
+@tasks.loop(minutes=1)
+async def publish_stats():
+    """Publikuje podsumowanie tego procesu we wspólnym magazynie (do globalnych statystyk)."""
+    try:
+        await run_storage(storage.save_stats, PROCESS_LABEL, local_stats())
+    except Exception as e:
+        log_event(logging.ERROR, f"❌ Błąd publikacji statystyk: {e}", process=PROCESS_LABEL)
+
+@tasks.loop(minutes=1)
+async def evict_idle_guilds():
+    """Wyrzuca z pamięci bezczynne serwery (po TTL albo ponad budżet pamięci)."""
+    for guild_id in loaded_guilds.eviction_candidates(time.monotonic()):
+        try:
+            if await evict_guild(guild_id):
+                log_event(logging.DEBUG, "Serwer wyrzucony z pamięci", guild=guild_id)
+        except Exception as e:
+            log_event(logging.ERROR, f"❌ Błąd wyrzucania serwera z pamięci: {e}", guild=guild_id)
 
-    for character_name, expiration_time in expired_characters.items():
-        if current_time > expiration_time:
-            expired_to_remove.append(character_name)
+@tasks.loop(minutes=5)
+async def compact_journals():
+    """Składa długie dzienniki do snapshotów serwerów."""
+    for guild_id, size in list(journal_sizes.items()):
+        if size >= JOURNAL_COMPACT_THRESHOLD:
+            await save_data(guild_id)
 
-    for character_name in expired_to_remove:
-        expired_characters.pop(character_name, None)
-        claimed_characters.pop(character_name, None)
-        print(f"{character_name} has expired and is now available again.")
+class ReactionDispatcher:
+    """Jedno miejsce obsługi reakcji: słownik message_id -> oczekujące zebranie.
 
-@tasks.loop(minutes=random.randint(1, 5))
-async def spawn_random_character():
-    """Losowo pojawiają się postacie w ustawionych kanałach."""
-    await bot.wait_until_ready()
+    Zamiast osobnego bot.wait_for z funkcją check dla każdego losowania
+    (każda reakcja sprawdzana przez wszystkie) reakcja trafia od razu do
+    wpisu swojej wiadomości. Wpis znika po zebraniu, timeoucie lub anulowaniu.
+    """
 
-    for guild_id, channel_id in spawn_channels.items():
-        channel = bot.get_channel(channel_id)
-        if not channel:
-            continue  # Jeśli kanał nie istnieje, pomijamy
+    def __init__(self):
+        self.pending = {}  # message_id -> (future, user_id lub None, emoji)
 
-        character = get_random_character()
+    async def wait(self, message_id, timeout, user_id=None, emoji="✅"):
+        """Czeka na reakcję `emoji` (opcjonalnie tylko od user_id); zwraca ID reagującego."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = (future, user_id, emoji)
+        try:
+            with phase("wait"):
+                return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(message_id, None)
+
+    def dispatch(self, message_id, user_id, emoji):
+        entry = self.pending.get(message_id)
+        if entry is None:
+            return False
+        future, expected_user, expected_emoji = entry
+        if emoji != expected_emoji or (expected_user is not None and user_id != expected_user):
+            return False
+        if not future.done():
+            future.set_result(user_id)
+        return True
+
+reactions = ReactionDispatcher()
 
-        if character['name'] in claimed_characters:
-            continue  # Jeśli postać już jest zajęta, pomijamy
+@bot.event
+async def on_raw_reaction_add(payload):
+    if bot.user is not None and payload.user_id == bot.user.id:
+        return
+    reactions.dispatch(payload.message_id, payload.user_id, str(payload.emoji))
 
-        embed = discord.Embed(title=f"🔥 A wild {character['name']} appears!", color=discord.Color.blue())
-        embed.set_image(url=character["image"])
-        embed.set_footer(text=f"Rarity: {character['rarity']}")
+SPAWN_MIN_SECONDS = 60          # najkrótsza przerwa między spawnami na serwerze
+SPAWN_MAX_SECONDS = 300         # najdłuższa przerwa (losujemy z tego przedziału)
+SPAWN_CLAIM_SECONDS = 300       # ile czasu postać czeka na zebranie
+MAX_OUTSTANDING_SPAWNS = 100    # limit jednocześnie wiszących spawnów na wszystkich serwerach
 
-        message = await channel.send(embed=embed)
-        await message.add_reaction("✅")  # Dodaj reakcję do przechwycenia postaci
+async def spawn_character(guild_id):
+    """Jeden cykl spawnu na serwerze: wysyła postać i czeka na jej zebranie."""
+    channel = bot.get_channel(spawn_channels.get(guild_id))
+    if not channel:
+        return  # Jeśli kanał nie istnieje, pomijamy
 
-        expired_characters[character['name']] = time.time() + 300  # Postać wygasa po 5 minutach
+    await ensure_guild_loaded(guild_id)
 
-        def check(reaction, user):
-            return user != bot.user and reaction.message.id == message.id and str(reaction.emoji) == "✅"
+    character = get_random_character(guild_id)
 
-        try:
-            reaction, user = await bot.wait_for("reaction_add", timeout=300, check=check)
+    if not character:
+        return  # Wszystkie postacie są już zajęte
 
-            # Przypisujemy postać użytkownikowi
-            user_collection.setdefault(str(guild_id), {}).setdefault(str(user.id), [])
-            claimed_characters[character['name']] = str(user.id)
-            user_collection[str(guild_id)][str(user.id)].append(character)
+    # Postać jest zarezerwowana do zebrania albo wygaśnięcia (silnik terminów ją zwolni)
+    record_mutation(guild_id, {"op": "reserve", "id": character["id"], "until": time.time() + SPAWN_CLAIM_SECONDS})
 
-            # Zapisujemy dane po zdobyciu postaci
-            await save_data(guild_id)
+    embed = character_embed("spawn", character)
+
+    message = await channel.send(embed=embed)
+    await message.add_reaction("✅")  # Dodaj reakcję do przechwycenia postaci
+
+    try:
+        user_id = str(await reactions.wait(message.id, timeout=SPAWN_CLAIM_SECONDS))
+
+        # Przypisujemy postać użytkownikowi (zapis trafia do dziennika)
+        async with locks.user(guild_id, user_id):
+            already_claimed = owner_of(guild_id, character['id']) is not None
+            if not already_claimed:
+                record_mutation(guild_id, {"op": "claim", "user": user_id, "id": character["id"]})
+
+        if already_claimed:
+            await message.reply(f"**{character['name']}** has already been claimed by someone else!")
+            return
+
+        await message.reply(f"<@{user_id}> claimed **{character['name']}**!")
 
-            await message.reply(f"{user.mention} claimed **{character['name']}**!")
+    except asyncio.TimeoutError:
+        await message.reply("⏳ The character disappeared!")
+
+class SpawnScheduler:
+    """Każdy serwer ze spawnami ma własne zadanie asyncio z losowym odstępem.
+
+    Serwery nie czekają na siebie nawzajem: niezebrana postać blokuje tylko
+    kolejny spawn na swoim serwerze. Gdy wisi MAX_OUTSTANDING_SPAWNS spawnów,
+    kolejne cykle są pomijane zamiast ustawiać się w kolejce.
+    """
+
+    def __init__(self):
+        self.tasks = {}        # guild_id -> asyncio.Task
+        self.outstanding = 0   # spawny czekające na zebranie
+        self.skipped = 0       # cykle pominięte przez limit
+        self.lag = deque(maxlen=1000)  # opóźnienie startu spawnu względem planu (s)
+
+    def start(self, guild_id):
+        task = self.tasks.get(guild_id)
+        if task is None or task.done():
+            self.tasks[guild_id] = asyncio.create_task(self.run_guild(guild_id))
+
+    def stop(self, guild_id):
+        task = self.tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    def start_all(self):
+        for guild_id in spawn_channels:
+            self.start(guild_id)
+
+    async def run_guild(self, guild_id):
+        await bot.wait_until_ready()
+        while guild_id in spawn_channels:
+            delay = random.uniform(SPAWN_MIN_SECONDS, SPAWN_MAX_SECONDS)
+            due = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            self.lag.append(time.monotonic() - due)
+
+            if self.outstanding >= MAX_OUTSTANDING_SPAWNS:
+                self.skipped += 1
+                continue
+
+            self.outstanding += 1
+            try:
+                await spawn_character(guild_id)
+            except Exception as e:
+                log_event(logging.ERROR, f"❌ Błąd spawnu: {e}", guild=guild_id)
+            finally:
+                self.outstanding -= 1
+
+    def stats(self):
+        """Liczba serwerów, wiszące spawny i opóźnienie startu (średnie/maks., w sekundach)."""
+        lag = list(self.lag)
+        return {
+            "guilds": sum(1 for task in self.tasks.values() if not task.done()),
+            "outstanding": self.outstanding,
+            "skipped": self.skipped,
+            "lag_avg": sum(lag) / len(lag) if lag else 0.0,
+            "lag_max": max(lag, default=0.0)
+        }
 
-        except asyncio.TimeoutError:
-            await message.reply("⏳ The character disappeared!")
+spawn_scheduler = SpawnScheduler()
+
+def start_background_loops():
+    """Uruchamia wygasanie rezerwacji i pętle zapisu/utrzymania (te już działające pomija)."""
+    expiry_engine.start()
+    for loop in (flush_journals, compact_journals, maintain_roll_limits, publish_stats, evict_idle_guilds):
+        if not loop.is_running():
+            loop.start()
 
 @bot.event
 async def on_ready():
-    if not cleanup_expired_characters.is_running():
-        cleanup_expired_characters.start()
-    
-    if not spawn_random_character.is_running():
-        spawn_random_character.start()
+    spawn_scheduler.start_all()
 
-    print(f'Logged in as {bot.user}')
-    
+    log_event(logging.INFO, f"Logged in as {bot.user}", guilds=len(bot.guilds))
+
+    # on_ready przychodzi też po każdym wznowieniu połączenia - synchronizację i
+    # wstępne ładowanie robimy tylko przy pierwszym (nowe serwery ładują się leniwie)
+    global startup_started
+    if startup_started:
+        return
+    startup_started = True
+    if connect_started is not None:
+        startup_times["connect"] = time.perf_counter() - connect_started
+
+    await asyncio.gather(sync_command_tree(), preload_guilds([str(guild.id) for guild in bot.guilds]))
+    log_event(logging.INFO, "⏱️ Start bota", **{f"{name}_ms": round(seconds * 1000) for name, seconds in startup_times.items()})
+
+# Start: czasy etapów (import, connect, sync, preload) w sekundach, w logu i /metrics
+startup_times = {}
+connect_started = None
+startup_started = False
+COMMAND_TREE_HASH_FILE = os.path.join(DATA_FOLDER, "command_tree.sha256")
+
+def command_tree_hash():
+    """Skrót definicji wszystkich komend slash (to, co sync wysyła do Discorda)."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+async def sync_command_tree():
+    """Synchronizuje komendy tylko, gdy ich definicje zmieniły się od ostatniej synchronizacji.
+
+    Przy kilku procesach synchronizuje tylko proces z shardem 0 (komendy są globalne).
+    """
+    started = time.perf_counter()
     try:
+        if owned_shards is not None and 0 not in owned_shards:
+            return
+        tree_hash = command_tree_hash()
+        with contextlib.suppress(OSError):
+            with open(COMMAND_TREE_HASH_FILE, "r", encoding="utf-8") as f:
+                if f.read().strip() == tree_hash:
+                    log_event(logging.INFO, "Komendy bez zmian, pomijam synchronizację")
+                    return
         await bot.tree.sync()
-        print("✅ Slash commands zsynchronizowane pomyślnie.")
+        await run_storage(write_file_atomic, COMMAND_TREE_HASH_FILE, tree_hash)
+        log_event(logging.INFO, "✅ Slash commands zsynchronizowane pomyślnie")
     except Exception as e:
-        print(f"❌ Błąd synchronizacji komend: {e}")
-
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    return "Bot is running!"
-
-def run():
-    app.run(host="0.0.0.0", port=8080)
+        log_event(logging.ERROR, f"❌ Błąd synchronizacji komend: {e}")
+    finally:
+        startup_times["sync"] = time.perf_counter() - started
+
+PRELOAD_CONCURRENCY = max(1, int(os.getenv("PRELOAD_CONCURRENCY", "16")))
+
+async def preload_guilds(guild_ids):
+    """Ładuje stan znanych serwerów, najwyżej PRELOAD_CONCURRENCY naraz.
+
+    Odczyty i tak idą po kolei przez wątek zapisów, ale budowa stanu w pętli
+    (_apply_snapshot) jednego serwera nakłada się na odczyt następnego. Po zapełnieniu
+    budżetu GUILD_CACHE_BUDGET_MB przestajemy - reszta załaduje się przy pierwszym użyciu.
+    """
+    started = time.perf_counter()
+    budget = GUILD_CACHE_BUDGET_MB * 1024 * 1024
+    used = sum(loaded_guilds.guild_bytes(guild_id) for guild_id in loaded_guilds)
+    limiter = asyncio.Semaphore(PRELOAD_CONCURRENCY)
+
+    async def preload(guild_id):
+        nonlocal used
+        async with limiter:
+            if used >= budget:
+                return "skipped"
+            if guild_id in loaded_guilds:
+                return "loaded"  # już wliczony do `used`
+            used += GUILD_BASE_BYTES  # rezerwacja, żeby równoległe ładowania nie przekroczyły budżetu
+            try:
+                await ensure_guild_loaded(guild_id)
+            except Exception as e:
+                used -= GUILD_BASE_BYTES
+                log_event(logging.ERROR, f"❌ Błąd wstępnego ładowania: {e}", guild=guild_id)
+                return "failed"
+            used += loaded_guilds.guild_bytes(guild_id) - GUILD_BASE_BYTES
+            return "loaded"
+
+    results = Counter(await asyncio.gather(*(preload(guild_id) for guild_id in guild_ids)))
+    startup_times["preload"] = time.perf_counter() - started
+    log_event(
+        logging.INFO, "✅ Serwery załadowane", guilds=len(guild_ids), loaded=results["loaded"],
+        failed=results["failed"], skipped=results["skipped"], ms=round(startup_times["preload"] * 1000)
+    )
+    if results["skipped"]:
+        log_event(
+            logging.WARNING, "⚠️ Budżet pamięci serwerów zapełniony - pozostałe załadują się przy pierwszym użyciu",
+            skipped=results["skipped"], budget_mb=GUILD_CACHE_BUDGET_MB
+        )
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+# Serwer HTTP zdrowia i metryk działa w pętli bota (aiohttp przychodzi razem z discord.py),
+# bez osobnego wątku
+HTTP_PORT = int(os.getenv("PORT", "8080"))
+http_runner = None
+
+def seconds_since_last_save():
+    return None if last_save_time is None else time.monotonic() - last_save_time
+
+def gateway_latency():
+    # Przed pierwszym heartbeatem discord.py zwraca nan
+    latency = bot.latency
+    return latency if math.isfinite(latency) else None
+
+def collect_metrics():
+    """Zwraca bieżące metryki jako (nazwa, typ, opis, wartość)."""
+    spawns = spawn_scheduler.stats()
+    return [
+        ("marvelbot_up", "gauge", "1 when the bot is connected and ready.", int(bot.is_ready() and not bot.is_closed())),
+        ("marvelbot_gateway_latency_seconds", "gauge", "Discord gateway heartbeat latency.", gateway_latency()),
+        ("marvelbot_seconds_since_last_save", "gauge", "Time since the last successful journal flush or snapshot.", seconds_since_last_save()),
+        ("marvelbot_guilds", "gauge", "Guilds the bot is in.", len(bot.guilds)),
+        ("marvelbot_guilds_loaded", "gauge", "Guilds with state loaded in memory.", len(loaded_guilds)),
+        ("marvelbot_ownership_conflict_guilds", "gauge", "Loaded guilds with duplicate owners on disk; snapshots paused until repaired.", len(ownership_conflicts)),
+        ("marvelbot_guild_cache_hits_total", "counter", "Commands that found their guild in memory.", loaded_guilds.hits),
+        ("marvelbot_guild_cache_misses_total", "counter", "Guild loads from storage.", loaded_guilds.misses),
+        ("marvelbot_guild_cache_evictions_total", "counter", "Idle guilds flushed and dropped from memory.", loaded_guilds.evictions),
+        ("marvelbot_guild_cache_estimated_bytes", "gauge", "Estimated memory of resident guild state (last sweep).", loaded_guilds.estimated_bytes),
+        ("marvelbot_journal_buffered_records", "gauge", "Journal records waiting for the next flush.", sum(map(len, journal_buffers.values()))),
+        ("marvelbot_journal_records", "gauge", "Journal records on disk since the last snapshot.", sum(journal_sizes.values())),
+        ("marvelbot_reservations", "gauge", "Spawned characters waiting to be claimed or to expire.", sum(map(len, expiry_engine.deadlines.values()))),
+        ("marvelbot_roll_limiter_users", "gauge", "Users tracked by the roll limiter.", sum(map(len, roll_limiter.records.values()))),
+        ("marvelbot_spawn_tasks", "gauge", "Running per-guild spawn tasks.", spawns["guilds"]),
+        ("marvelbot_spawns_outstanding", "gauge", "Spawn messages still waiting for a claim.", spawns["outstanding"]),
+        ("marvelbot_spawns_skipped_total", "counter", "Spawns skipped because of the outstanding cap.", spawns["skipped"]),
+        ("marvelbot_spawn_lag_max_seconds", "gauge", "Worst recent delay of a spawn behind its schedule.", spawns["lag_max"]),
+    ] + [
+        (f"marvelbot_startup_{name}_seconds", "gauge", f"Startup time spent in {name}.", seconds)
+        for name, seconds in startup_times.items()
+    ]
+
+def render_metrics():
+    """Formatuje metryki w tekstowym formacie Prometheusa."""
+    lines = []
+    for name, kind, description, value in collect_metrics():
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    lines.extend(histogram_lines())
+    return "\n".join(lines) + "\n"
+
+def histogram_lines():
+    """Histogramy czasów komend i zapisów oraz liczniki wolnych wywołań."""
+    lines = [
+        "# HELP marvelbot_operation_seconds Duration of commands and saves/loads, total and per phase.",
+        "# TYPE marvelbot_operation_seconds histogram"
+    ]
+    for (operation, phase_name), histogram in sorted(latency_histograms.items()):
+        labels = f'operation="{operation}",phase="{phase_name}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'marvelbot_operation_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"marvelbot_operation_seconds_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"marvelbot_operation_seconds_count{{{labels}}} {histogram.count}")
+    lines.append(f"# HELP marvelbot_slow_operations_total Calls slower than {SLOW_COMMAND_SECONDS}s, not counting user wait.")
+    lines.append("# TYPE marvelbot_slow_operations_total counter")
+    for operation, count in sorted(slow_operations.items()):
+        lines.append(f'marvelbot_slow_operations_total{{operation="{operation}"}} {count}')
+    return lines
+
+async def handle_home(request):
+    return web.Response(text="Bot is running!")
+
+async def handle_healthz(request):
+    ready = bot.is_ready() and not bot.is_closed()
+    return web.json_response({
+        "status": "ok" if ready else "starting",
+        "latency_seconds": gateway_latency(),
+        "seconds_since_last_save": seconds_since_last_save(),
+        "guilds_loaded": len(loaded_guilds)
+    }, status=200 if ready else 503)
+
+async def handle_metrics(request):
+    return web.Response(text=render_metrics(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def start_http_server():
+    """Uruchamia serwer zdrowia i metryk (z setup_hook, więc działa już podczas logowania)."""
+    global http_runner
+    if http_runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/", handle_home)
+    app.router.add_get("/healthz", handle_healthz)
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, "0.0.0.0", HTTP_PORT).start()
+    except OSError:
+        await runner.cleanup()
+        raise
+    http_runner = runner
+    log_event(logging.INFO, "🌐 Serwer zdrowia i metryk działa", port=HTTP_PORT)
 
 @bot.tree.command(name="set_spawn_channel", description="Set the channel for random character spawns.")
+@timed_command
 async def set_spawn_channel(interaction: discord.Interaction, channel: discord.TextChannel):
     """Ustawia kanał, w którym będą pojawiać się postacie."""
     guild_id = str(interaction.guild.id)
     spawn_channels[guild_id] = channel.id
+    spawn_scheduler.start(guild_id)
     await interaction.response.send_message(f"✅ Characters will now spawn in {channel.mention}!", ephemeral=True)
 
+@bot.tree.command(name="reload_data", description="Reload this server's data from disk.")
+@app_commands.default_permissions(administrator=True)
+@timed_command
+async def reload_data(interaction: discord.Interaction):
+    """Odświeża stan serwera z dysku (np. po ręcznej edycji pliku)."""
+    guild_id = str(interaction.guild.id)
+    await reload_guild(guild_id)
+    await interaction.response.send_message("✅ Server data reloaded from disk.", ephemeral=True)
+
+@bot.tree.command(name="reload_catalog", description="Reload the character catalog without restarting the bot.")
+@app_commands.default_permissions(administrator=True)
+@timed_command
+async def reload_catalog(interaction: discord.Interaction):
+    """Podmienia katalog postaci na wersję z pliku (bez restartu i ponownej synchronizacji komend)."""
+    try:
+        new_catalog = await hot_reload_catalog()
+    except (OSError, ValueError) as e:
+        log_event(logging.ERROR, f"❌ Nie przeładowano katalogu: {e}")
+        details = str(e)
+        if len(details) > 1800:
+            details = details[:1800] + "\n…"
+        await interaction.response.send_message(f"❌ Catalog not reloaded, keeping the current one:\n```{details}```", ephemeral=True)
+        return
+    await interaction.response.send_message(f"✅ Catalog reloaded: {len(new_catalog)} characters.", ephemeral=True)
+
 @bot.tree.command(name="roll", description="Roll a new character (1 claim per 10 rolls, 10 rolls max/hour)")
-@commands.cooldown(1, 8, commands.BucketType.user)
+@timed_command
 async def roll(interaction: discord.Interaction):
-    import time
     guild_id = str(interaction.guild.id)
     user_id = str(interaction.user.id)
-    current_time = time.time()
 
-    await load_data(guild_id)
+    await ensure_guild_loaded(guild_id)
 
-    # Initialize or get user roll/claim data
-    user_rolls.setdefault(guild_id, {})
-    user_claims.setdefault(guild_id, {})
-    claimed_characters.setdefault(guild_id, {})
-    user_collection.setdefault(guild_id, {})
-
-    last_roll_time, roll_count = user_rolls[guild_id].get(user_id, (0, 0))
-    claims = user_claims[guild_id].get(user_id, 0)
-
-    # If an hour has passed, reset roll count and allow claiming again
-    if current_time - last_roll_time >= 3600:
-        roll_count = 0
-        claims = 0
-
-    # Check if user has rolled 10 times in the current hour
-    if roll_count >= 10:
-        remaining_time = int(3600 - (current_time - last_roll_time))
-        minutes, seconds = divmod(remaining_time, 60)
+    # Od sprawdzenia limitu do record_roll nie ma żadnego await - równoległe /roll
+    # tego samego użytkownika nie przejdą razem przez sprawdzenie
+    current_time = time.time()
+    retry_after = roll_limiter.retry_after(guild_id, user_id, current_time)
+    if retry_after > 0:
+        minutes, seconds = divmod(int(retry_after) + 1, 60)
         time_left = f"{minutes}m {seconds}s" if minutes > 0 else f"{seconds}s"
-        await interaction.response.send_message(
-            f"🛑 You've reached the roll limit (10 rolls/hour).\n⏳ Time until reset: **{time_left}**",
-            ephemeral=True
-        )
+        if roll_limiter.limit_reached(guild_id, user_id, current_time):
+            await interaction.response.send_message(
+                f"🛑 You've reached the roll limit ({ROLL_LIMIT} rolls/hour).\n⏳ Time until reset: **{time_left}**",
+                ephemeral=True
+            )
+        else:
+            await interaction.response.send_message(
+                f"⏳ You must wait **{time_left}** before rolling again!",
+                ephemeral=True
+            )
         return
 
     # Get a random character for the roll
@@ -595,132 +2237,174 @@ async def roll(interaction: discord.Interaction):
         await interaction.response.send_message("❌ No more unclaimed characters available!", ephemeral=True)
         return
 
-    # Embed color based on rarity
-    rarity_colors = {
-        "Common": discord.Color.light_gray(),
-        "Rare": discord.Color.blue(),
-        "Epic": discord.Color.purple(),
-        "Legendary": discord.Color.gold()
-    }
-    color = rarity_colors.get(character["rarity"], discord.Color.default())
+    # Update roll count
+    roll_limiter.record_roll(guild_id, user_id, current_time)
 
-    embed = discord.Embed(title=f"You found {character['name']}!", color=color)
-    embed.set_image(url=character["image"])
-    embed.set_footer(text=f"Rarity: {character['rarity']}")
+    # Embed z prekompilowanego szablonu (kolor zależy od rzadkości)
+    embed = character_embed("roll", character)
 
     # Send embed to user and add reaction for claiming
     await interaction.response.send_message(embed=embed)
     message = await interaction.original_response()
     await message.add_reaction("✅")
 
-    # Update roll count
-    user_rolls[guild_id][user_id] = (current_time, roll_count + 1)
-    await save_data(guild_id)
-
     # Wait for the user to react and claim the character
-    def check(reaction, user):
-        return (
-            user != interaction.client.user and
-            reaction.message.id == message.id and
-            str(reaction.emoji) == "✅" and
-            user.id == interaction.user.id
-        )
-
     try:
-        reaction, user = await bot.wait_for("reaction_add", timeout=60.0, check=check)
+        await reactions.wait(message.id, timeout=60.0, user_id=interaction.user.id)
 
         # Check if user has claimed a character already
-        if claims >= 1:  # Allow only one claim for every 10 rolls
+        if not roll_limiter.can_claim(guild_id, user_id, time.time()):  # Allow only one claim for every 10 rolls
             await interaction.followup.send(f"🛑 You can only claim **1 character** per 10 rolls!", ephemeral=True)
             return
 
         # Add the character to the user's collection
-        claimed_characters[guild_id][character['name']] = user_id
-        user_collection[guild_id].setdefault(user_id, []).append(character)
+        async with locks.user(guild_id, user_id):
+            already_claimed = owner_of(guild_id, character['id']) is not None
+            if not already_claimed:
+                record_mutation(guild_id, {"op": "claim", "user": user_id, "id": character["id"]})
+
+        if already_claimed:
+            await interaction.followup.send(f"**{character['name']}** has already been claimed by someone else!", ephemeral=True)
+            return
 
         # Update claim count
-        user_claims[guild_id][user_id] = 1  # Claim 1 character for every 10 rolls
+        roll_limiter.record_claim(guild_id, user_id, time.time())
 
-        await save_data(guild_id)
-        await interaction.followup.send(f"{user.mention} claimed **{character['name']}**!")
+        await interaction.followup.send(f"{interaction.user.mention} claimed **{character['name']}**!")
 
     except asyncio.TimeoutError:
         await interaction.followup.send(f"The roll timed out.")
 
-# Error handler for cooldown
-@roll.error
-async def roll_error(interaction: discord.Interaction, error):
-    if isinstance(error, commands.CommandOnCooldown):
-        remaining = int(error.retry_after)
-        minutes, seconds = divmod(remaining, 60)
-        time_left = f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
-        await interaction.response.send_message(
-            f"⏳ You must wait **{time_left}** before rolling again!",
-            ephemeral=True
-        )
-    else:
-        raise error
-
-# Error handler for cooldown
-@roll.error
-async def roll_error(interaction: discord.Interaction, error):
-    if isinstance(error, commands.CommandOnCooldown):
-        remaining = int(error.retry_after)
-        minutes, seconds = divmod(remaining, 60)
-        time_str = f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
-        await interaction.response.send_message(
-            f"⏳ You must wait **{time_str}** before rolling again!",
-            ephemeral=True
+class TTLCache:
+    """Ograniczony cache z czasem życia wpisów; przy przepełnieniu wypada najdawniej użyty."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard_where(self, predicate):
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+COLLECTION_PAGE_SIZE = 15
+collection_pages = TTLCache(maxsize=1000, ttl=900)  # (guild, user, filtr) -> (wersja, ID postaci, {strona: tekst})
+
+def get_collection_page(guild_id, user_id, rarity, page):
+    """Zwraca (tekst strony, liczba stron, liczba postaci) dla filtra rzadkości (None = wszystkie).
+
+    Lista ID i wyrenderowane strony są zapamiętane do następnej zmiany
+    kolekcji, więc otwarcie dużej kolekcji kosztuje tyle co małej.
+    """
+    version = collection_versions.get(guild_id, {}).get(user_id, 0)
+    key = (guild_id, user_id, rarity)
+    entry = collection_pages.get(key)
+    if entry is None or entry[0] != version:
+        by_rarity = rarity_index.get(guild_id, {}).get(user_id, {})
+        if rarity is None:
+            order = list(RARITIES) + sorted(r for r in by_rarity if r not in RARITIES)
+            ids = [i for r in order for i in by_rarity.get(r, ())]
+        else:
+            ids = list(by_rarity.get(rarity, ()))
+        entry = (version, ids, {})
+        collection_pages.set(key, entry)
+
+    _, ids, rendered = entry
+    pages = max(1, -(-len(ids) // COLLECTION_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    text = rendered.get(page)
+    if text is None:
+        start = page * COLLECTION_PAGE_SIZE
+        text = "".join(
+            f"**{c['name']}** ({c['rarity']})\n"
+            for c in map(get_character, ids[start:start + COLLECTION_PAGE_SIZE])
+        ) or "No characters here."
+        rendered[page] = text
+    return text, pages, len(ids)
+
+class CollectionView(View):
+    """Kolekcja stronicowana przyciskami, z filtrem rzadkości; strony renderowane na żądanie."""
+
+    def __init__(self, guild_id, owner):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.owner = owner
+        self.user_id = str(owner.id)
+        self.rarity = None
+        self.page = 0
+        self.children[-1].options = [discord.SelectOption(label="All", value="All")] + [
+            discord.SelectOption(label=r, value=r) for r in RARITIES
+        ]
+
+    def render(self):
+        text, pages, total = get_collection_page(self.guild_id, self.user_id, self.rarity, self.page)
+        self.page = min(self.page, pages - 1)
+        embed = discord.Embed(
+            title=f"{self.owner.name}'s Character Collection",
+            description=f"**Total Characters:** {total}" + (f" ({self.rarity})" if self.rarity else ""),
+            color=discord.Color.green()
         )
-    else:
-        raise error
+        embed.set_thumbnail(url=self.owner.display_avatar.url)
+        embed.add_field(name="Your Collection:", value=text, inline=False)
+        embed.set_footer(text=f"Page {self.page + 1}/{pages}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.owner.id:
+            await interaction.response.send_message("This is not your collection!", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.gray)
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.gray)
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        self.page += 1
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.select(placeholder="Filter by rarity")
+    async def filter_rarity(self, interaction: discord.Interaction, select):
+        self.rarity = None if select.values[0] == "All" else select.values[0]
+        self.page = 0
+        await interaction.response.edit_message(embed=self.render(), view=self)
 
 @bot.tree.command(name="collection", description="Displays the characters you have collected.")
+@timed_command
 async def collection(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
     guild_id = str(interaction.guild.id)
 
-    await load_data(guild_id)
+    await ensure_guild_loaded(guild_id)
 
-    if guild_id not in user_collection or user_id not in user_collection[guild_id]:
+    if not collection_of(guild_id, user_id):
         await interaction.response.send_message("You haven't collected any characters yet.", ephemeral=True)
         return
-        
-    sorted_characters = sorted(user_collection[guild_id][user_id], key=lambda x: x["rarity"])
-    embeds = []
-    collection_text = ""
-    char_limit = 1024  # Limit for each embed field
-
-    embed = discord.Embed(
-        title=f"{interaction.user.name}'s Character Collection",
-        description=f"**Total Characters:** {len(sorted_characters)}",
-        color=discord.Color.green()
-    )
-    embed.set_thumbnail(url=interaction.user.avatar.url) 
-    for character in sorted_characters:
-        line = f"**{character['name']}** ({character['rarity']})\n"
-        if len(collection_text) + len(line) > char_limit:
-            embed.add_field(name="Your Collection:", value=collection_text, inline=False)
-            embeds.append(embed)
-            collection_text = line
-            embed = discord.Embed(
-                title=f"{interaction.user.name}'s Character Collection",
-                color=discord.Color.green() )
-        else:
-            collection_text += line
 
-    if collection_text:  # Add remaining characters to embed
-        embed.add_field(name="Your Collection:", value=collection_text, inline=False)
-        embeds.append(embed)
-
-    # Send embed if collection exists
-    if embeds:
-        for embed in embeds:
-            await interaction.response.send_message(embed=embed)
-    else:
-        await interaction.response.send_message("You don't have any characters in your collection.", ephemeral=True)
+    view = CollectionView(guild_id, interaction.user)
+    await interaction.response.send_message(embed=view.render(), view=view)
 
 @bot.tree.command(name="give", description="Give a character to another user.")
+@timed_command
 async def give(interaction: discord.Interaction, member: discord.Member, character_name: str):
     guild_id = str(interaction.guild.id)
     giver_id = str(interaction.user.id)
@@ -731,134 +2415,263 @@ async def give(interaction: discord.Interaction, member: discord.Member, charact
         await interaction.response.send_message("You can't give a character to yourself!", ephemeral=True)
         return
 
-    await load_data(guild_id)
+    await ensure_guild_loaded(guild_id)
 
-    # Ensure collections exist
-    user_collection.setdefault(guild_id, {})
-    user_collection[guild_id].setdefault(giver_id, [])
-    user_collection[guild_id].setdefault(recipient_id, [])
+    async with locks.users(guild_id, giver_id, recipient_id):
+        # Find the character in the giver's collection
+        character = find_character(guild_id, giver_id, character_name)
 
-    # Find the character in the giver's collection
-    character = next((c for c in user_collection[guild_id][giver_id] if c["name"].lower() == character_name.lower()), None)
+        # Transfer the character
+        if character:
+            record_mutation(guild_id, {"op": "give", "from": giver_id, "to": recipient_id, "id": character["id"]})
 
     if not character:
         await interaction.response.send_message(f"{interaction.user.mention}, you don't own **{character_name}**!", ephemeral=True)
         return
 
-    # Transfer the character
-    user_collection[guild_id][giver_id] = [c for c in user_collection[guild_id][giver_id] if c["name"].lower() != character_name.lower()]
-    user_collection[guild_id][recipient_id].append(character)
+    await interaction.response.send_message(f"{interaction.user.mention} gave **{character_name}** to {member.mention}!")
 
-    # Save data
-    await save_data(guild_id)
+class ConfirmationView(View):
+    """Przyciski Yes/No; value to True/False po kliknięciu albo None po upływie czasu."""
 
-    await interaction.response.send_message(f"{interaction.user.mention} gave **{character_name}** to {member.mention}!")
+    def __init__(self):
+        super().__init__(timeout=30)
+        self.value = None
+
+    @discord.ui.button(label="Yes", style=discord.ButtonStyle.green)
+    async def confirm(self, interaction: discord.Interaction, button: Button):
+        await interaction.response.defer()
+        self.value = True
+        self.stop()
+
+    @discord.ui.button(label="No", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: Button):
+        await interaction.response.defer()
+        self.value = False
+        self.stop()
 
 @bot.tree.command(name="remove", description="Remove a character from your collection.")
 @app_commands.describe(character_name="Name of the character to remove")
+@timed_command
 async def remove(interaction: discord.Interaction, character_name: str):
     guild_id = str(interaction.guild.id)
     user_id = str(interaction.user.id)
 
-    await load_data(guild_id)
-
-    user_collection.setdefault(guild_id, {})
-    user_collection[guild_id].setdefault(user_id, [])
-
-    user_chars = user_collection[guild_id][user_id]
+    await ensure_guild_loaded(guild_id)
 
-    char_to_remove = next((c for c in user_chars if c["name"].lower() == character_name.lower()), None)
+    char_to_remove = find_character(guild_id, user_id, character_name)
     if not char_to_remove:
         await interaction.response.send_message(f"{interaction.user.mention}, you do not own **{character_name}**!", ephemeral=True)
         return
 
     # 🔹 Tworzymy embed z informacją o postaci
-    embed = discord.Embed(
-        title=f"Remove {char_to_remove['name']}?",
-        description="Are you sure you want to remove this character from your collection?",
-        color=discord.Color.red()
+    embed = character_embed(
+        "remove", char_to_remove,
+        description="Are you sure you want to remove this character from your collection?"
     )
-    embed.set_thumbnail(url=char_to_remove["image"])
-    embed.set_footer(text=f"Rarity: {char_to_remove['rarity']}")
 
     # 🔹 Potwierdzenie
-    class ConfirmationView(View):
-        def __init__(self):
-            super().__init__(timeout=30)
-            self.value = None
-
-        @discord.ui.button(label="Yes", style=discord.ButtonStyle.green)
-        async def confirm(self, interaction: discord.Interaction, button: Button):
-            await interaction.response.defer()
-            self.value = True
-            self.stop()
+    view = ConfirmationView()
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-        @discord.ui.button(label="No", style=discord.ButtonStyle.red)
-        async def cancel(self, interaction: discord.Interaction, button: Button):
-            await interaction.response.defer()
-            self.value = False
-            self.stop()
+    with phase("wait"):
+        await view.wait()
+
+    if view.value:
+        # Usuń z kolekcji (postać mogła zniknąć podczas potwierdzania)
+        async with locks.user(guild_id, user_id):
+            still_owned = owner_of(guild_id, char_to_remove["id"]) == user_id
+            if still_owned:
+                record_mutation(guild_id, {"op": "remove", "user": user_id, "id": char_to_remove["id"]})
+
+        if not still_owned:
+            await interaction.followup.send(f"You no longer own **{character_name}**.", ephemeral=True)
+            return
+
+        await interaction.followup.send(
+            f"❌ {interaction.user.mention} has removed **{character_name}** from their collection!",
+            ephemeral=True
+        )
+    else:
+        await interaction.followup.send("Character removal canceled.", ephemeral=True)
 
+@give.autocomplete("character_name")
+@remove.autocomplete("character_name")
+async def owned_character_autocomplete(interaction: discord.Interaction, current: str):
+    """Podpowiada nazwy postaci z kolekcji wywołującego (indeks prefiksów)."""
+    guild_id = str(interaction.guild.id)
+    await ensure_guild_loaded(guild_id)
+    names = autocomplete_owned(guild_id, str(interaction.user.id), current)
+    return [app_commands.Choice(name=name, value=name) for name in names]
+
+# Komendy zbiorcze: wybór filtrem, jedno potwierdzenie, potem jedna blokada, jeden rekord
+# dziennika (jeden zapis) i jedna odpowiedź, niezależnie od liczby postaci.
+BULK_RARITY_CHOICES = [app_commands.Choice(name=r, value=r) for r in ("All",) + RARITIES]
+BULK_PREVIEW_NAMES = 15
+
+def bulk_summary(character_ids):
+    """Opis paczki do potwierdzenia: liczba postaci według rzadkości i początek listy nazw."""
+    counts = {}
+    for character_id in character_ids:
+        rarity = get_character(character_id)["rarity"]
+        counts[rarity] = counts.get(rarity, 0) + 1
+    names = ", ".join(get_character(i)["name"] for i in character_ids[:BULK_PREVIEW_NAMES])
+    if len(character_ids) > BULK_PREVIEW_NAMES:
+        names += f" and {len(character_ids) - BULK_PREVIEW_NAMES} more"
+    by_rarity = ", ".join(f"{counts[r]} {r}" for r in RARITIES + ("Unknown",) if r in counts)
+    return f"**{len(character_ids)} characters** ({by_rarity})\n{names}"
+
+@bot.tree.command(name="give_many", description="Give several characters to another user at once.")
+@app_commands.describe(
+    rarity="Give every character of this rarity",
+    characters="Optional comma-separated names to narrow the selection"
+)
+@app_commands.choices(rarity=BULK_RARITY_CHOICES)
+@timed_command
+async def give_many(interaction: discord.Interaction, member: discord.Member,
+                    rarity: app_commands.Choice[str], characters: str = ""):
+    guild_id = str(interaction.guild.id)
+    giver_id = str(interaction.user.id)
+    recipient_id = str(member.id)
+
+    if giver_id == recipient_id:
+        await interaction.response.send_message("You can't give characters to yourself!", ephemeral=True)
+        return
+
+    await ensure_guild_loaded(guild_id)
+
+    selected = select_owned(guild_id, giver_id, rarity.value, characters)
+    if not selected:
+        await interaction.response.send_message("You don't own any characters matching that selection.", ephemeral=True)
+        return
+
+    embed = discord.Embed(
+        title=f"Give to {member.name}?",
+        description=bulk_summary(selected),
+        color=discord.Color.blue()
+    )
     view = ConfirmationView()
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-    await view.wait()
+    with phase("wait"):
+        await view.wait()
 
-    if view.value:
-        # Usuń z kolekcji
-        user_collection[guild_id][user_id] = [
-            c for c in user_chars if c["name"].lower() != character_name.lower()
-        ]
+    if not view.value:
+        await interaction.followup.send("Transfer canceled.", ephemeral=True)
+        return
 
-        # Usuń z claimed_characters
-        if char_to_remove["name"] in claimed_characters.get(guild_id, {}):
-            del claimed_characters[guild_id][char_to_remove["name"]]
+    # Część postaci mogła zmienić właściciela podczas potwierdzania - przenosimy resztę
+    async with locks.users(guild_id, giver_id, recipient_id):
+        moved = [i for i in selected if owner_of(guild_id, i) == giver_id]
+        if moved:
+            record_mutation(guild_id, {"op": "give_many", "from": giver_id, "to": recipient_id, "ids": moved})
 
-        # Dodaj z powrotem do puli (jeśli trzeba)
-        if char_to_remove["name"].lower() not in {c["name"].lower() for c in characters}:
-            characters.append(char_to_remove)
+    if not moved:
+        await interaction.followup.send("You no longer own any of the selected characters.", ephemeral=True)
+        return
 
-        try:
-            await save_data(guild_id)
-            await interaction.followup.send(
-                f"❌ {interaction.user.mention} has removed **{character_name}** from their collection!",
-                ephemeral=True
-            )
-        except Exception as e:
-            await interaction.followup.send(f"⚠️ An error occurred while saving the data: {e}", ephemeral=True)
-    else:
-        await interaction.followup.send("Character removal canceled.", ephemeral=True)
+    await interaction.followup.send(
+        f"{interaction.user.mention} gave **{len(moved)}** characters to {member.mention}!"
+    )
 
-@bot.tree.command(name="leaderboard", description="Check the leaderboard of character collectors.")
-async def leaderboard(interaction: discord.Interaction):
+@bot.tree.command(name="remove_many", description="Remove several characters from your collection at once.")
+@app_commands.describe(
+    rarity="Remove every character of this rarity",
+    characters="Optional comma-separated names to narrow the selection"
+)
+@app_commands.choices(rarity=BULK_RARITY_CHOICES)
+@timed_command
+async def remove_many(interaction: discord.Interaction, rarity: app_commands.Choice[str], characters: str = ""):
     guild_id = str(interaction.guild.id)
-    if guild_id not in user_collection or not user_collection[guild_id]:
-        await interaction.response.send_message("No data available for the leaderboard in this server.", ephemeral=True)
+    user_id = str(interaction.user.id)
+
+    await ensure_guild_loaded(guild_id)
+
+    selected = select_owned(guild_id, user_id, rarity.value, characters)
+    if not selected:
+        await interaction.response.send_message("You don't own any characters matching that selection.", ephemeral=True)
         return
 
-    leaderboard = sorted(
-        user_collection[guild_id].items(),
-        key=lambda x: len(x[1]), reverse=True
+    embed = discord.Embed(
+        title="Remove from your collection?",
+        description=bulk_summary(selected),
+        color=discord.Color.red()
     )
+    view = ConfirmationView()
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-    embed = discord.Embed(title="🏆 Leaderboard - Character Collectors", color=discord.Color.gold())
+    with phase("wait"):
+        await view.wait()
+
+    if not view.value:
+        await interaction.followup.send("Character removal canceled.", ephemeral=True)
+        return
+
+    async with locks.user(guild_id, user_id):
+        removed = [i for i in selected if owner_of(guild_id, i) == user_id]
+        if removed:
+            record_mutation(guild_id, {"op": "remove_many", "user": user_id, "ids": removed})
+
+    if not removed:
+        await interaction.followup.send("You no longer own any of the selected characters.", ephemeral=True)
+        return
 
-    for i, (user_id, collection) in enumerate(leaderboard[:10]):
+    await interaction.followup.send(
+        f"❌ {interaction.user.mention} has removed **{len(removed)}** characters from their collection!",
+        ephemeral=True
+    )
+
+user_names_cache = TTLCache(maxsize=5000, ttl=3600)
+
+async def resolve_user_names(guild, user_ids):
+    """Zwraca {user_id: nazwa}: najpierw cache, potem członkowie z gateway, na końcu równoległe fetch_user."""
+    names = {}
+    missing = []
+    for user_id in user_ids:
+        name = user_names_cache.get(user_id)
+        if name is None:
+            member = guild.get_member(int(user_id)) if guild else None
+            if member is not None:
+                name = member.name
+                user_names_cache.set(user_id, name)
+        if name is None:
+            missing.append(user_id)
+        else:
+            names[user_id] = name
+
+    async def fetch_name(user_id):
         try:
-            user = await bot.fetch_user(user_id)
-        except discord.NotFound:
-            user = None
+            user = await bot.fetch_user(int(user_id))
+            return user.name
+        except discord.HTTPException:
+            return None
 
-        common_count = sum(1 for c in collection if isinstance(c, dict) and c.get('rarity') == "Common")
-        rare_count = sum(1 for c in collection if isinstance(c, dict) and c.get('rarity') == "Rare")
-        epic_count = sum(1 for c in collection if isinstance(c, dict) and c.get('rarity') == "Epic")
-        legendary_count = sum(1 for c in collection if isinstance(c, dict) and c.get('rarity') == "Legendary")
+    for user_id, name in zip(missing, await asyncio.gather(*(fetch_name(u) for u in missing))):
+        if name is not None:
+            user_names_cache.set(user_id, name)
+        names[user_id] = name or "User Not Found"
+    return names
 
-        user_name = user.name if user else "User Not Found"
+@bot.tree.command(name="leaderboard", description="Check the leaderboard of character collectors.")
+@timed_command
+async def leaderboard(interaction: discord.Interaction):
+    guild_id = str(interaction.guild.id)
+    await ensure_guild_loaded(guild_id)
+    # Counters are kept up to date on every claim/give/trade/remove
+    leaderboard = leaderboards[guild_id].top(10) if guild_id in leaderboards else []
+    if not leaderboard:
+        await interaction.response.send_message("No data available for the leaderboard in this server.", ephemeral=True)
+        return
+
+    user_names = await resolve_user_names(interaction.guild, [user_id for user_id, _ in leaderboard])
+    embed = discord.Embed(title="🏆 Leaderboard - Character Collectors", color=discord.Color.gold())
+
+    for i, (user_id, (total, common_count, rare_count, epic_count, legendary_count)) in enumerate(leaderboard):
+        user_name = user_names[user_id]
 
         embed.add_field(
             name=f"{i + 1}. {user_name}",
-            value=(f"**Total Characters:** {len(collection)}\n"
+            value=(f"**Total Characters:** {total}\n"
                    f"**Common:** {common_count} | **Rare:** {rare_count}\n"
                    f"**Epic:** {epic_count} | **Legendary:** {legendary_count}"),
             inline=False
@@ -866,7 +2679,24 @@ async def leaderboard(interaction: discord.Interaction):
 
     await interaction.response.send_message(embed=embed)
 
+@bot.tree.command(name="stats", description="Show collection statistics across all servers.")
+@timed_command
+async def stats(interaction: discord.Interaction):
+    totals = await global_stats()
+    embed = discord.Embed(title="📊 Global Statistics", color=discord.Color.blurple())
+    embed.add_field(name="Servers", value=str(totals["guilds"]))
+    embed.add_field(name="Collectors", value=str(totals["collectors"]))
+    embed.add_field(name="Characters Collected", value=str(totals["characters"]))
+    embed.add_field(
+        name="By Rarity",
+        value=" | ".join(f"**{r}:** {count}" for r, count in totals["rarity"].items()),
+        inline=False
+    )
+    embed.set_footer(text=f"Aggregated from {totals['processes']} bot process(es)")
+    await interaction.response.send_message(embed=embed)
+
 @bot.tree.command(name="trade", description="Trade a character with another user.")
+@timed_command
 async def trade(interaction: discord.Interaction, member: discord.Member):
     guild_id = str(interaction.guild.id)
     giver_id = str(interaction.user.id)
@@ -876,10 +2706,10 @@ async def trade(interaction: discord.Interaction, member: discord.Member):
         await interaction.response.send_message("You can't trade with yourself!", ephemeral=True)
         return
 
-    await load_data(guild_id)
+    await ensure_guild_loaded(guild_id)
     
-    giver_chars = user_collection.get(guild_id, {}).get(giver_id, [])
-    recipient_chars = user_collection.get(guild_id, {}).get(recipient_id, [])
+    giver_chars = collection_of(guild_id, giver_id)
+    recipient_chars = collection_of(guild_id, recipient_id)
 
     if not giver_chars or not recipient_chars:
         await interaction.response.send_message("One or both users have no characters to trade.", ephemeral=True)
@@ -893,7 +2723,7 @@ async def trade(interaction: discord.Interaction, member: discord.Member):
             self.giver_chars = giver_chars
             self.recipient_chars = recipient_chars
             # Prepare the options before the view is displayed
-            self.options = [discord.SelectOption(label=c["name"]) for c in (giver_chars if self.user == giver_id else recipient_chars)]
+            self.options = [discord.SelectOption(label=get_character(i)["name"]) for i in (giver_chars if self.user == giver_id else recipient_chars)]
 
         @discord.ui.select(
             placeholder="Select a character to trade",
@@ -909,39 +2739,115 @@ async def trade(interaction: discord.Interaction, member: discord.Member):
     giver_view = CharacterSelection(giver_id, giver_chars, recipient_chars)
     giver_view.children[0].options = giver_view.options  # Set options for giver view
     await interaction.response.send_message(f"{interaction.user.mention}, select a character to trade:", view=giver_view)
-    await giver_view.wait()
+    with phase("wait"):
+        await giver_view.wait()
 
     recipient_view = CharacterSelection(recipient_id, giver_chars, recipient_chars)
     recipient_view.children[0].options = recipient_view.options  # Set options for recipient view
     await interaction.followup.send(f"{member.mention}, select a character to trade:", view=recipient_view)
-    await recipient_view.wait()
+    with phase("wait"):
+        await recipient_view.wait()
 
     if not giver_view.selected_character or not recipient_view.selected_character:
         await interaction.followup.send("Trade canceled due to no selection.")
         return
 
-    # Exchange the characters
-    giver_char = next(c for c in giver_chars if c["name"].lower() == giver_view.selected_character.lower())
-    recipient_char = next(c for c in recipient_chars if c["name"].lower() == recipient_view.selected_character.lower())
-
-    # Remove selected characters from both users
-    user_collection[guild_id][giver_id] = [c for c in giver_chars if c != giver_char]
-    user_collection[guild_id][recipient_id] = [c for c in recipient_chars if c != recipient_char]
-
-    # Add the selected characters to the opposite users
-    user_collection[guild_id][giver_id].append(recipient_char)
-    user_collection[guild_id][recipient_id].append(giver_char)
-
-    # Save the data after the trade
-    await save_data(guild_id)
+    # Exchange the characters (recorded in the guild journal)
+    async with locks.users(guild_id, giver_id, recipient_id):
+        # Either side may have given the character away while selecting
+        giver_char = find_owned_id(guild_id, giver_id, giver_view.selected_character)
+        recipient_char = find_owned_id(guild_id, recipient_id, recipient_view.selected_character)
+        still_owned = giver_char is not None and recipient_char is not None
+        if still_owned:
+            record_mutation(guild_id, {
+                "op": "trade",
+                "giver": giver_id,
+                "recipient": recipient_id,
+                "giver_id": giver_char,
+                "recipient_id": recipient_char
+            })
+
+    if not still_owned:
+        await interaction.followup.send("Trade canceled: one of the characters is no longer available.")
+        return
 
     await interaction.followup.send(f"✅ Trade completed! {interaction.user.mention} swapped **{giver_view.selected_character}** for **{recipient_view.selected_character}** with {member.mention}.")
 
-token = os.getenv("DISCORD_TOKEN")
+def recommended_shard_count(token):
+    """Pyta Discorda o zalecaną liczbę shardów (GET /gateway/bot)."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (marvelbot, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+def run_shard_processes(processes, shard_count):
+    """Dzieli shardy na ciągłe zakresy i uruchamia każdy zakres w osobnym procesie bota.
+
+    Procesy dzielą katalog danych (albo bazę SQLite); każdy ładuje tylko serwery swoich
+    shardów i dostaje własny port HTTP (PORT + numer procesu). Padnięty proces jest
+    uruchamiany ponownie.
+    """
+    processes = max(1, min(processes, shard_count))
+    bounds = [shard_count * i // processes for i in range(processes + 1)]
+    children = {}
+
+    def spawn(index):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=f"{bounds[index]}-{bounds[index + 1] - 1}",
+            PORT=str(HTTP_PORT + index)
+        )
+        children[index] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        log_event(logging.INFO, "🚀 Proces shardów uruchomiony", shards=env["SHARD_IDS"], pid=children[index].pid)
 
-if not token:
-    print("Error: DISCORD_TOKEN environment variable is not set.")
-    exit(1)
-    
-keep_alive()
-bot.run(token)
\ No newline at end of file
+    for index in range(processes):
+        spawn(index)
+    try:
+        while True:
+            time.sleep(5)
+            for index, child in list(children.items()):
+                if child.poll() is not None:
+                    log_event(logging.ERROR, "❌ Proces shardów zakończył się, restart", shards=f"{bounds[index]}-{bounds[index + 1] - 1}", code=child.returncode)
+                    spawn(index)
+    except KeyboardInterrupt:
+        for child in children.values():
+            child.terminate()
+        for child in children.values():
+            child.wait()
+
+def main():
+    global connect_started
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-sqlite":
+        # python bot.py migrate-sqlite  - jednorazowa migracja plików JSON do SQLite
+        migrate_json_to_sqlite()
+        exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "check-ownership":
+        # python bot.py check-ownership [--repair]  - sprawdzenie (i naprawa) posiadania postaci
+        broken = check_ownership(repair="--repair" in sys.argv[2:])
+        exit(1 if broken and "--repair" not in sys.argv[2:] else 0)
+
+    token = os.getenv("DISCORD_TOKEN")
+
+    if not token:
+        log_event(logging.ERROR, "Error: DISCORD_TOKEN environment variable is not set.")
+        exit(1)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "shards":
+        # python bot.py shards <procesy> [liczba shardów]  - shardy w kilku procesach
+        processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+        shard_count = int(sys.argv[3]) if len(sys.argv) > 3 else SHARD_COUNT or recommended_shard_count(token)
+        run_shard_processes(processes, shard_count)
+        exit(0)
+
+    connect_started = time.perf_counter()
+    bot.run(token)
+
+startup_times["import"] = time.perf_counter() - STARTED_AT
+
+# Import modułu (np. w benchmarkach) nie uruchamia bota
+if __name__ == "__main__":
+    main()
\ No newline at end of file